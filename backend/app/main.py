@@ -3,7 +3,7 @@
 import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import measure
+from app.routers import measure, diagnostics, profiles, history
 
 app = FastAPI(title="VisionMetrix", version="1.0.0")
 
@@ -20,6 +20,9 @@ app.add_middleware(
 
 # ── Routers ────────────────────────────────────────────────────────────
 app.include_router(measure.router, prefix="/api")
+app.include_router(profiles.router, prefix="/api")
+app.include_router(history.router, prefix="/api")
+app.include_router(diagnostics.router, prefix="/api")
 
 
 @app.get("/")
@@ -0,0 +1,71 @@
+# app/routers/diagnostics.py
+
+from fastapi import APIRouter, Depends, Query
+
+from app.services import memory_stats, frame_scheduler, measurement_log, job_queue
+from app.services.session_store import session_memory
+from app.utils.admin_auth import require_admin
+
+router = APIRouter()
+
+
+# ── GET /api/admin/memory ────────────────────────────────────────────
+@router.get("/admin/memory", dependencies=[Depends(require_admin)])
+async def get_memory(
+    top:      int  = Query(5, ge=1, le=100),
+    snapshot: bool = Query(False),
+):
+    """
+    Memory diagnostics (all sizes in bytes):
+      sessions  – session store total + largest entries
+      jobs      – upload bytes held by unfinished async jobs, finished jobs
+                  retained + their result bytes
+      stages    – per pipeline stage: last / peak / avg bytes produced
+      requests  – per endpoint: bytes accounted for one request
+      snapshot  – top tracemalloc allocation sites (only if tracing is on)
+    """
+    out = {"sessions": session_memory(top), "jobs": job_queue.memory(),
+           **memory_stats.report()}
+    if snapshot:
+        out["snapshot"] = memory_stats.snapshot_top(top)
+    return out
+
+
+# ── POST /api/admin/memory/tracemalloc ───────────────────────────────
+@router.post("/admin/memory/tracemalloc", dependencies=[Depends(require_admin)])
+async def set_tracemalloc(enabled: bool = Query(...)):
+    """Turn tracemalloc on/off at runtime (roughly 2× slower allocations while on)."""
+    memory_stats.set_tracing(enabled)
+    return {"tracing": enabled}
+
+
+# ── POST /api/admin/memory/reset ─────────────────────────────────────
+@router.post("/admin/memory/reset", dependencies=[Depends(require_admin)])
+async def reset_memory():
+    """Clear the per-stage and per-endpoint counters."""
+    memory_stats.reset()
+    return {"message": "Memory counters reset."}
+
+
+# ── GET /api/admin/frames ────────────────────────────────────────────
+@router.get("/admin/frames", dependencies=[Depends(require_admin)])
+async def get_frame_stats(top: int = Query(10, ge=1, le=100)):
+    """
+    Live-frame scheduler counters: submitted / processed / dropped / failed,
+    current in-flight and pending frames, and the sessions dropping most.
+    """
+    return frame_scheduler.stats(top)
+
+
+# ── GET /api/admin/history ───────────────────────────────────────────
+@router.get("/admin/history", dependencies=[Depends(require_admin)])
+async def get_history_stats():
+    """Measurement-log writer counters: queued / written / dropped rows, backlog."""
+    return measurement_log.stats()
+
+
+# ── GET /api/admin/jobs ──────────────────────────────────────────────
+@router.get("/admin/jobs", dependencies=[Depends(require_admin)])
+async def get_job_stats():
+    """Background job counters and the jobs currently queued / running / retained."""
+    return job_queue.stats()
@@ -0,0 +1,102 @@
+# app/routers/history.py
+
+import csv
+import io
+import json
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.services import measurement_log
+from app.services.measurement_log import COLUMNS
+from app.utils.admin_auth import require_admin
+
+router = APIRouter()
+
+
+def _session_scope(
+    session_id:    str | None = Query(None),
+    x_admin_token: str | None = Header(None),
+) -> str | None:
+    """
+    One session's history is readable by whoever holds its session ID;
+    every session's at once needs the X-Admin-Token header.
+    """
+    if session_id is None:
+        require_admin(x_admin_token)
+    return session_id
+
+
+def _csv_chunks(rows_iter):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(COLUMNS)
+    for rows in rows_iter:
+        writer.writerows(rows)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    yield buf.getvalue()
+
+
+def _json_chunks(rows_iter):
+    yield "["
+    first = True
+    for rows in rows_iter:
+        body = ",".join(json.dumps(dict(zip(COLUMNS, r))) for r in rows)
+        yield body if first else "," + body
+        first = False
+    yield "]"
+
+
+# ── GET /api/history/export ──────────────────────────────────────────
+@router.get("/history/export")
+async def export_history(
+    format:     str          = Query("csv"),
+    session_id: str | None   = Depends(_session_scope),
+    since:      float | None = Query(None, description="Unix time, inclusive"),
+    until:      float | None = Query(None, description="Unix time, exclusive"),
+):
+    """
+    Stream the measurement log as CSV or a JSON array, oldest first.
+    Rows are read from SQLite in fixed-size chunks, so memory use does not
+    grow with the size of the export.  Without `session_id` (all sessions)
+    the X-Admin-Token header is required.
+    """
+    if format not in ("csv", "json"):
+        raise HTTPException(status_code=400, detail="format must be 'csv' or 'json'.")
+
+    rows_iter = measurement_log.iter_export(session_id, since, until)
+    if format == "csv":
+        return StreamingResponse(
+            _csv_chunks(rows_iter), media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="measurements.csv"'},
+        )
+    return StreamingResponse(
+        _json_chunks(rows_iter), media_type="application/json",
+        headers={"Content-Disposition": 'attachment; filename="measurements.json"'},
+    )
+
+
+# ── GET /api/history/aggregate ───────────────────────────────────────
+@router.get("/history/aggregate")
+async def aggregate_history(
+    group_by:   str          = Query("session"),
+    window_s:   float        = Query(3600, gt=0),
+    session_id: str | None   = Depends(_session_scope),
+    since:      float | None = Query(None),
+    until:      float | None = Query(None),
+):
+    """
+    Mean + p10/p50/p90 of width, height, area and distance per group.
+    `group_by` = "session" | "window" (fixed `window_s`-second buckets).
+    Without `session_id` (all sessions) the X-Admin-Token header is required.
+    Returns: { groups: [{session_id | window_start, window_end, rows,
+               width_mm: {count, mean, p10, p50, p90}, …}] }
+    """
+    if group_by not in ("session", "window"):
+        raise HTTPException(status_code=400, detail="group_by must be 'session' or 'window'.")
+    groups = await run_in_threadpool(measurement_log.aggregate, group_by, window_s,
+                                     session_id, since, until)
+    return {"groups": groups}
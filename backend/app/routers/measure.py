@@ -1,21 +1,35 @@
 # app/routers/measure.py
 
 import json
+import time
 import base64
+import asyncio
 import cv2
 import numpy as np
 
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Path
-from fastapi.responses import Response
+from fastapi import APIRouter, UploadFile, File, Form, Header, HTTPException, Path
+from fastapi.responses import Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
 from app.utils.image_utils import read_image
 from app.services.a4_detector import detect_and_warp_a4, WARP_WIDTH, WARP_HEIGHT
-from app.services.contour_measure import auto_detect_objects
+from app.services.contour_measure import auto_detect_objects, QUALITY_LEVELS
+from app.services.dense_measure import dense_detect_objects
 from app.services.manual_measure import measure_distance, measure_polygon
 from app.services.session_store import set_session, get_session, set_scale, get_scale
+from app.services import memory_stats, frame_scheduler, measurement_log, job_queue
+from app.services.frame_scheduler import FrameDropped
+from app.services.memory_stats import account
+from app.services.calibration_profiles import (
+    ProfileNotFound, validate_name as validate_profile_name, warp_with_profile,
+)
+from app.services.job_queue import JobTooLarge, QueueFull
 
 router = APIRouter()
 
+SSE_POLL_S      = 0.1    # job event stream: check for new events this often
+SSE_KEEPALIVE_S = 15.0   # comment line after this much silence
+
 
 # ── GET /api/warped-frame/{session_id} ──────────────────────────────
 @router.get("/warped-frame/{session_id}")
@@ -63,6 +77,65 @@ def _decode_warped(warped_bytes: bytes):
     return cv2.imdecode(arr, cv2.IMREAD_COLOR)
 
 
+def _read_upload(file_bytes: bytes):
+    """Decode an uploaded image, accounting both the raw and decoded size."""
+    image = read_image(file_bytes)
+    account("decode", file_bytes, image)
+    return image
+
+
+def _check_quality(quality: str):
+    if quality not in QUALITY_LEVELS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid quality '{quality}'. Use one of: {', '.join(QUALITY_LEVELS)}."
+        )
+
+
+def _ms_since(t0: float) -> float:
+    return round((time.perf_counter() - t0) * 1000, 2)
+
+
+def _report_stages(result: dict, warp_ms: float, encode_ms: float):
+    """Wrap the detector's stage timings with the router's warp / encode costs."""
+    stages = result["pipeline"]["stages_ms"]
+    result["pipeline"]["stages_ms"] = {"a4_warp": warp_ms, **stages, "encode": encode_ms}
+
+
+def _warp_frame(image, profile: str | None):
+    """
+    Perspective-correct `image`: via a stored station profile when one is
+    named (drift check + warpPerspective), otherwise the full A4 cascade.
+    Returns (warped, mm_per_pixel, M, calibration) — calibration is the
+    profile info dict, or None for the cascade.
+    Any other failure (no A4, recalibration error) propagates to the caller.
+    """
+    if profile:
+        try:
+            validate_profile_name(profile)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    try:
+        with memory_stats.traced("a4_warp"):
+            if profile:
+                warped, mm_per_pixel, M, calibration = warp_with_profile(profile, image)
+            else:
+                warped, mm_per_pixel, M = detect_and_warp_a4(image)
+                calibration = None
+    except ProfileNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    account("a4_warp", warped)
+    return warped, mm_per_pixel, M, calibration
+
+
+def _encode_b64(warped) -> str:
+    """PNG-encode the warped frame as a data URL for the response."""
+    _, buffer = cv2.imencode(".png", warped)
+    warped_b64 = f"data:image/png;base64,{base64.b64encode(buffer).decode('utf-8')}"
+    account("response_b64", buffer, warped_b64)
+    return warped_b64
+
+
 # ── POST /api/detect-a4 ──────────────────────────────────────────────
 @router.post("/detect-a4")
 async def detect_a4(
@@ -74,18 +147,22 @@ async def detect_a4(
     Stores the warped (perspective-corrected) frame + mm/px scale in session.
     Returns: { mm_per_pixel, message }
     """
-    image = read_image(await file.read())
-
-    try:
-        warped, mm_per_pixel, M = detect_and_warp_a4(image)
-    except Exception as e:
-        raise HTTPException(status_code=422, detail=str(e))
-
-    # Encode warped frame as lossless PNG for storage.
-    # PNG avoids JPEG compression artifacts on object edges,
-    # which improves click accuracy in manual modes.
-    _, warped_buf = cv2.imencode(".png", warped)
-    set_session(session_id, mm_per_pixel, warped_buf.tobytes(), M)
+    with memory_stats.request("detect-a4"):
+        image = _read_upload(await file.read())
+
+        try:
+            with memory_stats.traced("a4_warp"):
+                warped, mm_per_pixel, M = detect_and_warp_a4(image)
+            account("a4_warp", warped)
+        except Exception as e:
+            raise HTTPException(status_code=422, detail=str(e))
+
+        # Encode warped frame as lossless PNG for storage.
+        # PNG avoids JPEG compression artifacts on object edges,
+        # which improves click accuracy in manual modes.
+        _, warped_buf = cv2.imencode(".png", warped)
+        account("png_encode", warped_buf)
+        set_session(session_id, mm_per_pixel, warped_buf.tobytes(), M)
 
     return {
         "mm_per_pixel": round(mm_per_pixel, 6),
@@ -94,10 +171,77 @@ async def detect_a4(
 
 
 # ── POST /api/auto-measure ───────────────────────────────────────────
+def _process_live_frame(session: dict, file_bytes: bytes,
+                        profile: str | None, quality: str,
+                        reuse_illumination: bool = False) -> dict:
+    """CPU-bound part of /auto-measure; runs in the threadpool."""
+    mm_per_pixel = session["mm_per_pixel"]
+
+    with memory_stats.request("auto-measure"):
+        image = _read_upload(file_bytes)
+
+        # Try fresh A4 detection (or the station profile) on the new frame
+        warped = None
+        calibration = None
+        t_warp = time.perf_counter()
+        try:
+            warped, mm_per_pixel_fresh, _M, calibration = _warp_frame(image, profile)
+            mm_per_pixel = mm_per_pixel_fresh   # use fresh scale if available
+        except HTTPException:
+            raise
+        except Exception:
+            # Fall back to stored warped frame from calibration
+            if session.get("warped_bytes"):
+                warped = _decode_warped(session["warped_bytes"])
+            else:
+                raise HTTPException(
+                    status_code=422,
+                    detail=(
+                        "Could not detect A4 in the current frame and no "
+                        "calibration image was stored. Please recalibrate."
+                    )
+                )
+        warp_ms = _ms_since(t_warp)
+
+        try:
+            with memory_stats.traced("detect_objects"):
+                # Opt-in: a fixed camera over an unchanged scene reuses the
+                # session's illumination field
+                illum_cache = None
+                if reuse_illumination:
+                    illum_cache = session.setdefault("illumination", {})
+                else:
+                    session.pop("illumination", None)       # drop a stale field
+                result = auto_detect_objects(warped, mm_per_pixel, quality,
+                                             illum_cache=illum_cache)
+
+            # Encode warped frame as base64 so frontend can show THIS exact frame
+            # behind the overlays, ensuring perfect alignment.
+            t_enc = time.perf_counter()
+            warped_b64 = _encode_b64(warped)
+            _report_stages(result, warp_ms, _ms_since(t_enc))
+
+        except Exception as e:
+            raise HTTPException(status_code=422, detail=f"Object detection failed: {e}")
+
+    # Tag as multi-object result; first object is initially selected
+    response = {
+        **result,
+        "selected_id": 0,
+        "warped_b64": warped_b64,
+    }
+    if calibration:
+        response["calibration"] = calibration
+    return response
+
+
 @router.post("/auto-measure")
 async def auto_measure(
-    session_id: str       = Form(...),
-    file:        UploadFile = File(...),
+    session_id:         str        = Form(...),
+    file:               UploadFile = File(...),
+    profile:            str | None = Form(None),
+    quality:            str        = Form("precise"),
+    reuse_illumination: bool       = Form(False),
 ):
     """
     Auto-detect the largest object in the current frame.
@@ -106,48 +250,33 @@ async def auto_measure(
       1. Try to detect A4 in the new frame and get a fresh warp.
       2. If that fails (e.g. user moved camera), fall back to the
          warped image captured during calibration.
+
+    With `profile`, the named station calibration replaces step 1.
+    `quality` = "precise" (default) | "preview"; the level used and per-stage
+    timings come back under `pipeline`.
+    `reuse_illumination=true` keeps the illumination field between frames
+    of this session and reuses it while the scene is unchanged.
+
+    Live frames are scheduled per session: one in flight plus one pending.
+    A pending frame replaced by a newer one gets 409 (frame dropped).
     Returns: { width_mm, height_mm, area_mm2, polygon_points }
     """
     session = _require_session(session_id)
-    mm_per_pixel = session["mm_per_pixel"]
-
-    image = read_image(await file.read())
-
-    # Try fresh A4 detection on the new frame
-    warped = None
-    try:
-        warped, mm_per_pixel_fresh, _M = detect_and_warp_a4(image)
-        mm_per_pixel = mm_per_pixel_fresh   # use fresh scale if available
-    except Exception:
-        # Fall back to stored warped frame from calibration
-        if session.get("warped_bytes"):
-            warped = _decode_warped(session["warped_bytes"])
-        else:
-            raise HTTPException(
-                status_code=422,
-                detail=(
-                    "Could not detect A4 in the current frame and no "
-                    "calibration image was stored. Please recalibrate."
-                )
-            )
+    _check_quality(quality)
+    file_bytes = await file.read()
 
     try:
-        result = auto_detect_objects(warped, mm_per_pixel)
-        
-        # Encode warped frame as base64 so frontend can show THIS exact frame
-        # behind the overlays, ensuring perfect alignment.
-        _, buffer = cv2.imencode(".png", warped)
-        warped_b64 = base64.b64encode(buffer).decode("utf-8")
-        
-    except Exception as e:
-        raise HTTPException(status_code=422, detail=f"Object detection failed: {e}")
-
-    # Tag as multi-object result; first object is initially selected
-    return {
-        **result, 
-        "selected_id": 0,
-        "warped_b64": f"data:image/png;base64,{warped_b64}"
-    }
+        response = await frame_scheduler.submit(session_id, _process_live_frame,
+                                                 session, file_bytes, profile, quality,
+                                                 reuse_illumination)
+    except FrameDropped:
+        raise HTTPException(
+            status_code=409,
+            detail="Frame dropped: superseded by a newer frame for this session."
+        )
+    measurement_log.record(session_id, "auto-measure",
+                           measurement_log.object_rows(response["objects"]))
+    return response
 
 
 # ── POST /api/manual-distance ────────────────────────────────────────
@@ -173,6 +302,8 @@ async def manual_distance(
         raise HTTPException(status_code=400, detail=f"Invalid points: {e}")
 
     distance = measure_distance(pts, mm_per_pixel)
+    measurement_log.record(session_id, "manual-distance",
+                           [{"shape_type": "distance", "distance_mm": distance}])
     return {"distance_mm": distance}
 
 
@@ -199,46 +330,228 @@ async def manual_polygon(
         raise HTTPException(status_code=400, detail=f"Invalid points: {e}")
 
     area = measure_polygon(pts, mm_per_pixel)
+    measurement_log.record(session_id, "manual-polygon",
+                           [{"shape_type": "polygon", "area_mm2": area}])
     return {"area_mm2": area}
 
 
 # ── POST /api/upload-measure ─────────────────────────────────────────
+def _process_upload(session_id: str, file_bytes: bytes, profile: str | None,
+                    quality: str, on_stage=None) -> dict:
+    """
+    The /upload-measure pipeline, shared with the async job endpoint.
+    `on_stage(name, ms)` is called as each stage finishes (decode, a4_warp,
+    the detector's own stages, encode).
+    """
+    report = on_stage or (lambda name, ms: None)
+    with memory_stats.request("upload-measure"):
+        t0 = time.perf_counter()
+        image = _read_upload(file_bytes)
+        report("decode", _ms_since(t0))
+
+        # 1 & 2. Detect & Warp
+        t_warp = time.perf_counter()
+        try:
+            warped, mm_per_pixel, M, calibration = _warp_frame(image, profile)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=422, detail=f"A4 Detection Failed: {e}")
+        warp_ms = _ms_since(t_warp)
+        report("a4_warp", warp_ms)
+
+        # Update session with these values so manual mode works on this image too
+        _, warped_buf = cv2.imencode(".png", warped)
+        account("png_encode", warped_buf)
+        set_session(session_id, mm_per_pixel, warped_buf.tobytes(), M)
+
+        # 3. Measure
+        try:
+            with memory_stats.traced("detect_objects"):
+                result = auto_detect_objects(warped, mm_per_pixel, quality,
+                                             on_stage=on_stage)
+            t_enc = time.perf_counter()
+            warped_b64 = _encode_b64(warped)
+            encode_ms = _ms_since(t_enc)
+            _report_stages(result, warp_ms, encode_ms)
+            report("encode", encode_ms)
+        except Exception as e:
+            raise HTTPException(status_code=422, detail=f"Object detection failed: {e}")
+
+    measurement_log.record(session_id, "upload-measure",
+                           measurement_log.object_rows(result["objects"]))
+    response = {
+        **result,
+        "selected_id": 0,
+        "mm_per_pixel": round(mm_per_pixel, 6),
+        "warped_b64": warped_b64,
+        "message": "Image uploaded and processed successfully."
+    }
+    if calibration:
+        response["calibration"] = calibration
+    return response
+
+
 @router.post("/upload-measure")
 async def upload_measure(
     session_id: str       = Form(...),
     file:        UploadFile = File(...),
+    profile:     str | None = Form(None),
+    quality:     str        = Form("precise"),
 ):
     """
     Combined workflow for static image uploads:
-    1. Detect A4 in the uploaded file.
+    1. Detect A4 in the uploaded file (or, with `profile`, reuse the stored
+       station calibration after a corner drift check).
     2. Perspective-warp the A4 area to 800x1131.
     3. Auto-detect objects in that warped frame.
     4. Return measurements + the warped frame as base64.
+    `quality` = "precise" (default) | "preview", reported under `pipeline`.
+    For large images behind a proxy timeout use POST /api/jobs/upload-measure.
     """
-    image = read_image(await file.read())
+    _check_quality(quality)
+    return _process_upload(session_id, await file.read(), profile, quality)
+
+
+# ── POST /api/dense-measure ──────────────────────────────────────────
+def _process_dense(session_id: str, file_bytes: bytes, profile: str | None) -> dict:
+    """CPU-bound part of /dense-measure; runs in the threadpool."""
+    with memory_stats.request("dense-measure"):
+        image = _read_upload(file_bytes)
+
+        try:
+            warped, mm_per_pixel, M, calibration = _warp_frame(image, profile)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=422, detail=f"A4 Detection Failed: {e}")
+
+        # Keep the session usable for manual mode on this image
+        _, warped_buf = cv2.imencode(".png", warped)
+        account("png_encode", warped_buf)
+        set_session(session_id, mm_per_pixel, warped_buf.tobytes(), M)
+
+        try:
+            result = dense_detect_objects(warped, mm_per_pixel)
+        except Exception as e:
+            raise HTTPException(status_code=422, detail=f"Dense detection failed: {e}")
+        warped_b64 = _encode_b64(warped)
+
+    measurement_log.record(session_id, "dense-measure",
+                           measurement_log.object_rows(result["objects"]))
+
+    response = {
+        **result,
+        "mm_per_pixel": round(mm_per_pixel, 6),
+        "warped_b64": warped_b64,
+    }
+    if calibration:
+        response["calibration"] = calibration
+    return response
 
-    # 1 & 2. Detect & Warp
-    try:
-        warped, mm_per_pixel, M = detect_and_warp_a4(image)
-    except Exception as e:
-        raise HTTPException(status_code=422, detail=f"A4 Detection Failed: {e}")
 
-    # Update session with these values so manual mode works on this image too
-    _, warped_buf = cv2.imencode(".png", warped)
-    set_session(session_id, mm_per_pixel, warped_buf.tobytes(), M)
+@router.post("/dense-measure")
+async def dense_measure(
+    session_id: str       = Form(...),
+    file:        UploadFile = File(...),
+    profile:     str | None = Form(None),
+):
+    """
+    Dense-scene mode for trays of small parts (washers, screws, …):
+    one threshold + connected-components pass measures EVERY part.
+    Touching parts are counted as one.
+    Returns: { objects: [{id, centroid, bbox, length_mm, width_mm,
+               area_mm2, angle_deg}], count, stats, mm_per_pixel, warped_b64 }
+    """
+    return await run_in_threadpool(_process_dense, session_id, await file.read(), profile)
 
-    # 3. Measure
-    try:
-        result = auto_detect_objects(warped, mm_per_pixel)
-        _, buffer = cv2.imencode(".png", warped)
-        warped_b64 = base64.b64encode(buffer).decode("utf-8")
-    except Exception as e:
-        raise HTTPException(status_code=422, detail=f"Object detection failed: {e}")
 
+# ── Async jobs: POST /api/jobs/upload-measure ────────────────────────
+@router.post("/jobs/upload-measure", status_code=202)
+async def submit_upload_job(
+    session_id: str       = Form(...),
+    file:        UploadFile = File(...),
+    profile:     str | None = Form(None),
+    quality:     str        = Form("precise"),
+):
+    """
+    Same inputs as /upload-measure, but returns a job ID immediately and
+    runs the pipeline on the background worker pool.
+    Poll GET /api/jobs/{job_id} or subscribe to GET /api/jobs/{job_id}/events.
+    Returns 202: { job_id, status, status_url, events_url }; 413 when the
+    upload alone exceeds the queue's byte cap, 503 when the queue is full.
+    """
+    _check_quality(quality)
+    file_bytes = await file.read()
+    try:
+        job = job_queue.submit("upload-measure", _process_upload,
+                               session_id, file_bytes, profile, quality)
+    except JobTooLarge:
+        raise HTTPException(status_code=413,
+                            detail="Upload is larger than the job queue accepts.")
+    except QueueFull:
+        raise HTTPException(status_code=503, detail="Job queue is full; retry later.",
+                            headers={"Retry-After": "5"})
     return {
-        **result,
-        "selected_id": 0,
-        "mm_per_pixel": round(mm_per_pixel, 6),
-        "warped_b64": f"data:image/png;base64,{warped_b64}",
-        "message": "Image uploaded and processed successfully."
+        "job_id":     job.id,
+        "status":     job.status,
+        "status_url": f"/api/jobs/{job.id}",
+        "events_url": f"/api/jobs/{job.id}/events",
     }
+
+
+def _require_job(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired.")
+    return job
+
+
+# ── GET /api/jobs/{job_id} ───────────────────────────────────────────
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str = Path(...)):
+    """
+    Job status: { job_id, status (queued|running|done|failed), stage,
+    stages: [{stage, ms}], result (when done), error {status_code, detail}
+    (when failed) }.  Finished jobs expire after VM_JOB_TTL_S seconds.
+    """
+    return _require_job(job_id).to_dict()
+
+
+# ── GET /api/jobs/{job_id}/events ────────────────────────────────────
+@router.get("/jobs/{job_id}/events")
+async def job_events(
+    job_id:        str        = Path(...),
+    last_event_id: str | None = Header(None),
+):
+    """
+    Server-sent events: `status` and `stage` events as they happen, then
+    one `result` event carrying the full job (as GET /api/jobs/{job_id}).
+    Reconnecting clients resume after their Last-Event-ID.
+    """
+    job = _require_job(job_id)
+    start = int(last_event_id) + 1 if last_event_id and last_event_id.isdigit() else 0
+
+    async def stream():
+        sent, idle = start, 0.0
+        while True:
+            finished = job.status in job_queue.TERMINAL   # read before the events
+            events = job.events[sent:]
+            for i, event in enumerate(events, sent):
+                yield f"id: {i}\nevent: {event['event']}\ndata: {json.dumps(event)}\n\n"
+            sent += len(events)
+            if finished:
+                yield f"event: result\ndata: {json.dumps(job.to_dict())}\n\n"
+                return
+            if events:
+                idle = 0.0
+            elif idle >= SSE_KEEPALIVE_S:
+                yield ": keepalive\n\n"             # keeps proxies from timing out
+                idle = 0.0
+            await asyncio.sleep(SSE_POLL_S)
+            idle += SSE_POLL_S
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={
+        "Cache-Control":     "no-cache",
+        "X-Accel-Buffering": "no",                  # nginx: don't buffer the stream
+    })
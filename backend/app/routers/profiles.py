@@ -0,0 +1,55 @@
+# app/routers/profiles.py
+
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Path
+from starlette.concurrency import run_in_threadpool
+
+from app.utils.image_utils import read_image
+from app.services.calibration_profiles import (
+    ProfileNotFound, create_profile, list_profiles, delete_profile, validate_name,
+)
+from app.utils.admin_auth import require_admin
+
+router = APIRouter()
+
+
+# ── GET /api/profiles ────────────────────────────────────────────────
+@router.get("/profiles")
+async def get_profiles():
+    """List stored station calibration profiles."""
+    return {"profiles": list_profiles()}
+
+
+# ── POST /api/profiles/{name} ────────────────────────────────────────
+@router.post("/profiles/{name}", dependencies=[Depends(require_admin)])
+async def save_profile(
+    name: str        = Path(...),
+    file: UploadFile = File(...),
+):
+    """
+    Calibrate a fixed station from an image of its A4 plate and persist the
+    result under `name` (overwrites an existing profile).  Profiles are
+    shared by every client, so this needs the X-Admin-Token header.
+    Returns: { name, mm_per_pixel, source_width, source_height }
+    """
+    try:
+        validate_name(name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    image = read_image(await file.read())
+    try:
+        return await run_in_threadpool(create_profile, name, image)
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+# ── DELETE /api/profiles/{name} ──────────────────────────────────────
+@router.delete("/profiles/{name}", dependencies=[Depends(require_admin)])
+async def remove_profile(name: str = Path(...)):
+    """Delete a stored profile (needs the X-Admin-Token header)."""
+    try:
+        delete_profile(name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ProfileNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"message": f"Profile '{name}' deleted."}
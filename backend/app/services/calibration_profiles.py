@@ -0,0 +1,213 @@
+# app/services/calibration_profiles.py
+"""
+Persistent calibration profiles for fixed camera stations.
+
+A profile stores everything the A4 cascade produces for a rigidly mounted
+camera — the perspective matrix, mm_per_pixel, the source resolution, the
+four refined sheet corners and a small grey patch around each corner — as
+<VM_PROFILE_DIR>/<name>.npz, so it survives restarts.
+
+Frames that reference a profile skip `detect_and_warp_a4` entirely:
+  1. Drift check — each stored corner patch is template-matched inside a
+     small search window of the new frame (4 tiny matchTemplate calls).
+  2. If every corner is still within DRIFT_MAX_PX → cv2.warpPerspective
+     with the stored matrix.
+  3. Otherwise the full cascade reruns for that frame only.  The stored
+     profile is never rewritten by a measurement request (those are
+     unauthenticated); a station that really moved is re-saved through
+     the admin-gated POST /api/profiles/{name}.
+"""
+import os
+import re
+import tempfile
+import threading
+
+import cv2
+import numpy as np
+
+from app.services.a4_detector import detect_and_warp_a4, WARP_WIDTH, WARP_HEIGHT
+
+PROFILE_DIR   = os.getenv("VM_PROFILE_DIR", "profiles")
+PATCH_SIZE    = 31      # corner patch side (px, odd)
+SEARCH_PX     = 6       # drift search radius around each stored corner
+DRIFT_MAX_PX  = 2.0     # larger corner shift → recalibrate
+MIN_MATCH     = 0.7     # TM_CCOEFF_NORMED below this → recalibrate
+
+_NAME_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+_cache: dict = {}
+_lock = threading.Lock()
+
+
+class ProfileNotFound(Exception):
+    """No calibration profile with that name."""
+
+
+def validate_name(name: str):
+    """Raise ValueError unless `name` is a safe profile file name."""
+    if not _NAME_RE.match(name):
+        raise ValueError("Profile name must be 1-64 characters of A-Z, a-z, 0-9, '_' or '-'.")
+
+
+def _path(name: str) -> str:
+    validate_name(name)
+    return os.path.join(PROFILE_DIR, f"{name}.npz")
+
+
+def _corner_patches(gray: np.ndarray, corners: np.ndarray) -> np.ndarray:
+    """(4, PATCH_SIZE, PATCH_SIZE) uint8 patches centred on each corner."""
+    return np.stack([
+        cv2.getRectSubPix(gray, (PATCH_SIZE, PATCH_SIZE), (float(x), float(y)))
+        for x, y in corners
+    ])
+
+
+def _source_corners(M: np.ndarray) -> np.ndarray:
+    """Map the warped-frame corners back through M⁻¹ to source-image corners."""
+    dst = np.array([[[0, 0]], [[WARP_WIDTH - 1, 0]],
+                    [[WARP_WIDTH - 1, WARP_HEIGHT - 1]], [[0, WARP_HEIGHT - 1]]],
+                   dtype=np.float32)
+    return cv2.perspectiveTransform(dst, np.linalg.inv(M)).reshape(4, 2)
+
+
+def _store(name: str, image: np.ndarray, M: np.ndarray, mm_per_pixel: float) -> dict:
+    gray    = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    corners = _source_corners(M)
+    profile = {
+        "name":         name,
+        "M":            np.asarray(M, dtype=np.float64),
+        "mm_per_pixel": float(mm_per_pixel),
+        "source_size":  (image.shape[1], image.shape[0]),   # (w, h)
+        "corners":      corners,
+        "patches":      _corner_patches(gray, corners),
+    }
+
+    # Write atomically so a crash never leaves a half-written profile
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=PROFILE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            np.savez(fh, M=profile["M"], mm_per_pixel=profile["mm_per_pixel"],
+                     source_size=np.array(profile["source_size"]),
+                     corners=corners, patches=profile["patches"])
+        os.replace(tmp, _path(name))
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+    with _lock:
+        _cache[name] = profile
+    return profile
+
+
+def _load(name: str) -> dict:
+    with _lock:
+        if name in _cache:
+            return _cache[name]
+    path = _path(name)
+    if not os.path.exists(path):
+        raise ProfileNotFound(f"Calibration profile '{name}' not found.")
+    with np.load(path, allow_pickle=False) as data:
+        profile = {
+            "name":         name,
+            "M":            data["M"],
+            "mm_per_pixel": float(data["mm_per_pixel"]),
+            "source_size":  tuple(int(v) for v in data["source_size"]),
+            "corners":      data["corners"],
+            "patches":      data["patches"],
+        }
+    with _lock:
+        _cache[name] = profile
+    return profile
+
+
+def _summary(profile: dict) -> dict:
+    w, h = profile["source_size"]
+    return {
+        "name":         profile["name"],
+        "mm_per_pixel": round(profile["mm_per_pixel"], 6),
+        "source_width":  w,
+        "source_height": h,
+    }
+
+
+# ── Public API ────────────────────────────────────────────────────────────────
+def create_profile(name: str, image: np.ndarray) -> dict:
+    """Run the full A4 cascade on `image` and persist the result as `name`."""
+    validate_name(name)                              # before the work
+    _, mm_per_pixel, M = detect_and_warp_a4(image)
+    return _summary(_store(name, image, M, mm_per_pixel))
+
+
+def list_profiles() -> list[dict]:
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    names = sorted(f[:-4] for f in os.listdir(PROFILE_DIR)
+                   if f.endswith(".npz") and _NAME_RE.match(f[:-4]))
+    return [_summary(_load(n)) for n in names]
+
+
+def delete_profile(name: str):
+    path = _path(name)
+    if not os.path.exists(path):
+        raise ProfileNotFound(f"Calibration profile '{name}' not found.")
+    os.remove(path)
+    with _lock:
+        _cache.pop(name, None)
+
+
+def measure_drift(profile: dict, image: np.ndarray) -> float:
+    """
+    Largest corner displacement (px) between the stored patches and `image`.
+    Returns inf when a corner can't be matched confidently.
+    Only the four search windows are converted to grey, not the whole frame.
+    """
+    win = PATCH_SIZE + 2 * SEARCH_PX
+    worst = 0.0
+    for (x, y), patch in zip(profile["corners"], profile["patches"]):
+        region = cv2.getRectSubPix(image, (win, win), (float(x), float(y)))
+        if region.ndim == 3:
+            region = cv2.cvtColor(region, cv2.COLOR_BGR2GRAY)
+        scores = cv2.matchTemplate(region, patch, cv2.TM_CCOEFF_NORMED)
+        _, best, _, (bx, by) = cv2.minMaxLoc(scores)
+        if best < MIN_MATCH:
+            return float("inf")
+        worst = max(worst, float(np.hypot(bx - SEARCH_PX, by - SEARCH_PX)))
+    return worst
+
+
+def warp_with_profile(name: str, image: np.ndarray):
+    """
+    Warp `image` with the stored calibration, recalibrating on drift.
+    A recalibration applies to this frame only; the profile is not re-saved.
+
+    Returns (warped, mm_per_pixel, M, info) where
+    info = {profile, recalibrated, drift_px}.
+    Raises ProfileNotFound, or Exception when drift forces a recalibration
+    and the A4 cascade fails.
+    """
+    profile = _load(name)
+    h, w = image.shape[:2]
+
+    drift = (measure_drift(profile, image)
+             if (w, h) == profile["source_size"] else float("inf"))
+
+    if drift <= DRIFT_MAX_PX:
+        warped = cv2.warpPerspective(image, profile["M"], (WARP_WIDTH, WARP_HEIGHT))
+        M, mm_per_pixel, recalibrated = profile["M"], profile["mm_per_pixel"], False
+    else:
+        try:
+            warped, mm_per_pixel, M = detect_and_warp_a4(image)
+        except Exception as e:
+            raise Exception(
+                f"Station '{name}' moved (corner drift exceeds {DRIFT_MAX_PX} px) "
+                f"and recalibration failed: {e}"
+            )
+        recalibrated = True
+
+    info = {
+        "profile":      name,
+        "recalibrated": recalibrated,
+        "drift_px":     None if drift == float("inf") else round(drift, 2),
+    }
+    return warped, mm_per_pixel, M, info
@@ -1,19 +1,89 @@
 # app/services/contour_measure.py
 
 import math
+import time
+import threading
 import cv2
 import numpy as np
 
+from app.services.memory_stats import account
+
 
 # ── Illumination / shadow normalisation ───────────────────────────────────────
-def _normalise_illumination(gray: np.ndarray) -> np.ndarray:
+ILLUM_SIGMA      = 9.5    # σ of the original 61×61 background blur (full res)
+ILLUM_DOWNSCALE  = 4      # background estimated at 1/4 resolution
+ILLUM_PROBE_DOWNSCALE = 16  # cache validity checked on a 1/16-resolution field …
+ILLUM_STABLE_TOL = 2.0    # … that may move by at most this (grey levels) anywhere
+
+_clahe_local = threading.local()
+
+
+def _clahe() -> cv2.CLAHE:
+    """One CLAHE instance per thread (CLAHE objects are not thread-safe)."""
+    clahe = getattr(_clahe_local, "clahe", None)
+    if clahe is None:
+        clahe = _clahe_local.clahe = cv2.createCLAHE(clipLimit=2.5, tileGridSize=(8, 8))
+    return clahe
+
+
+def _illumination_probe(gray: np.ndarray) -> np.ndarray:
+    """
+    The illumination field at 1/ILLUM_PROBE_DOWNSCALE resolution: a few
+    thousand cells, each the blurred brightness of a 16×16 block.  Pixel
+    noise averages out; a lighting change, or a part moving (which also
+    changes the blurred field around it), shifts some cell.
+    """
+    ph = max(gray.shape[0] // ILLUM_PROBE_DOWNSCALE, 1)
+    pw = max(gray.shape[1] // ILLUM_PROBE_DOWNSCALE, 1)
+    # Whole blocks only: INTER_AREA is ~5× faster at an integer ratio; the
+    # right / bottom remainder (< 16 px) is ignored
+    block = gray[:ph * ILLUM_PROBE_DOWNSCALE, :pw * ILLUM_PROBE_DOWNSCALE]
+    probe = cv2.resize(block, (pw, ph), interpolation=cv2.INTER_AREA).astype(np.float32)
+    return cv2.GaussianBlur(probe, (0, 0), ILLUM_SIGMA / ILLUM_PROBE_DOWNSCALE)
+
+
+def _illumination_field(gray: np.ndarray, cache: dict | None = None) -> np.ndarray:
+    """
+    Background illumination estimate, equivalent to GaussianBlur(gray, 61×61).
+
+    The field is low-frequency, so it is estimated on a 1/ILLUM_DOWNSCALE
+    image (area-averaged) with a proportionally smaller σ and bilinearly
+    upsampled — ~10× cheaper, within 3 grey levels of the full-res blur.
+
+    With `cache` (a per-session dict, opt-in), the previous frame's field is
+    reused while no cell of the coarse `_illumination_probe` has moved by
+    ILLUM_STABLE_TOL or more — i.e. while the field itself would not change,
+    not merely while the frame looks similar on average.
+    """
+    h, w = gray.shape
+
+    if cache is not None:
+        probe = _illumination_probe(gray)
+        prev  = cache.get("probe")
+        if (prev is not None and prev.shape == probe.shape
+                and cache["field"].shape == gray.shape
+                and cv2.norm(probe, prev, cv2.NORM_INF) < ILLUM_STABLE_TOL):
+            return cache["field"]
+
+    small = cv2.resize(gray, (max(w // ILLUM_DOWNSCALE, 1), max(h // ILLUM_DOWNSCALE, 1)),
+                       interpolation=cv2.INTER_AREA)
+    small_bg = cv2.GaussianBlur(small, (0, 0), ILLUM_SIGMA / ILLUM_DOWNSCALE)
+    field    = cv2.resize(small_bg, (w, h), interpolation=cv2.INTER_LINEAR)
+
+    if cache is not None:
+        cache["probe"] = probe
+        cache["field"] = field
+    return field
+
+
+def _normalise_illumination(gray: np.ndarray, cache: dict | None = None) -> np.ndarray:
     """
     Remove uneven lighting and soft shadows before edge detection.
 
     Method:
       1. Estimate background illumination with a very large Gaussian blur
          (doesn't preserve edges → captures only the slow gradient from
-         window/lamp positions).
+         window/lamp positions).  See `_illumination_field`.
       2. Divide the original image by this illumination map (scale to 0-255).
          Objects with good contrast survive; shadowed regions are lifted.
       3. Apply CLAHE for local contrast enhancement so even low-contrast
@@ -22,10 +92,9 @@ def _normalise_illumination(gray: np.ndarray) -> np.ndarray:
     This is the standard technique used in document scanning pipelines.
     It reduces shadow-induced measurement errors by 30-60 %.
     """
-    blur_bg = cv2.GaussianBlur(gray, (61, 61), 0)
+    blur_bg = _illumination_field(gray, cache)
     normalised = cv2.divide(gray, blur_bg, scale=255)
-    clahe = cv2.createCLAHE(clipLimit=2.5, tileGridSize=(8, 8))
-    return clahe.apply(normalised)
+    return _clahe().apply(normalised)
 
 
 # ── Contour expansion (compensates for Canny edge inward bias) ───────────────
@@ -72,8 +141,77 @@ def _refine_points_subpixel(gray: np.ndarray, pts: np.ndarray) -> np.ndarray:
     return pts_f
 
 
+# ── Sub-pixel edge refinement along contour normals ──────────────────────────
+EDGE_DECIMATE   = 2     # refine every Nth contour point
+EDGE_SEARCH_PX  = 7     # search ± this far along the normal
+EDGE_SAMPLE_PX  = 0.5   # profile sampling step
+EDGE_TANGENT_K  = 3     # tangent from points i±k (smooths pixel staircase)
+EDGE_MIN_GRAD   = 4.0   # weaker peaks (grey levels / px) keep the input point
+PREVIEW_EDGE_DECIMATE = 8
+
+
+def _refine_edges_normal(gray: np.ndarray, pts: np.ndarray,
+                         decimate: int = EDGE_DECIMATE,
+                         search_px: float = EDGE_SEARCH_PX) -> np.ndarray:
+    """
+    Move dense contour points onto the true edge, all points at once.
+
+    For every (decimated) point the contour normal is estimated from its
+    neighbours, the image is sampled along that normal in one cv2.remap
+    call, and the strongest intensity step in each profile is located to
+    sub-pixel precision with a parabola through the gradient peak.
+
+    Replaces cornerSubPix on round shapes: a corner detector iterating on
+    thousands of edge points is the slowest call in `_measure_pca`, while
+    this costs one remap over an (N × profile) grid.
+
+    Returns (M, 1, 2) float32 like cornerSubPix, M ≈ N / decimate.
+    """
+    p = pts.reshape(-1, 2).astype(np.float32)
+    n = len(p)
+    if n < 2 * EDGE_TANGENT_K + 1:
+        return p.reshape(-1, 1, 2)
+
+    # Tangent from neighbours on the DENSE contour, then decimate
+    tangent = np.roll(p, -EDGE_TANGENT_K, axis=0) - np.roll(p, EDGE_TANGENT_K, axis=0)
+    p, tangent = p[::decimate], tangent[::decimate]
+    norm = np.hypot(tangent[:, 0], tangent[:, 1])
+    norm[norm == 0] = 1
+    normal = np.stack([tangent[:, 1], -tangent[:, 0]], axis=1) / norm[:, None]
+
+    # Sample a float crop around the contour (remap on uint8 would round)
+    pad = int(math.ceil(search_px)) + 2
+    x0 = max(int(p[:, 0].min()) - pad, 0)
+    y0 = max(int(p[:, 1].min()) - pad, 0)
+    x1 = min(int(p[:, 0].max()) + pad + 1, gray.shape[1])
+    y1 = min(int(p[:, 1].max()) + pad + 1, gray.shape[0])
+    crop = gray[y0:y1, x0:x1].astype(np.float32)
+
+    t = np.arange(-search_px, search_px + EDGE_SAMPLE_PX / 2, EDGE_SAMPLE_PX,
+                  dtype=np.float32)
+    map_x = (p[:, 0:1] - x0) + normal[:, 0:1] * t
+    map_y = (p[:, 1:2] - y0) + normal[:, 1:2] * t
+    profile = cv2.remap(crop, map_x, map_y, cv2.INTER_LINEAR,
+                        borderMode=cv2.BORDER_REPLICATE)
+
+    # Central difference over 1 px; peak |gradient| + parabolic sub-sample fit
+    grad = np.abs(profile[:, 2:] - profile[:, :-2])
+    k    = np.argmax(grad, axis=1)
+    k    = np.clip(k, 1, grad.shape[1] - 2)
+    rows = np.arange(len(p))
+    a, b, c = grad[rows, k - 1], grad[rows, k], grad[rows, k + 1]
+    denom   = a - 2 * b + c
+    offset  = np.where(denom < 0, 0.5 * (a - c) / np.where(denom < 0, denom, -1), 0)
+    t_edge  = t[k + 1] + np.clip(offset, -0.5, 0.5) * EDGE_SAMPLE_PX
+
+    # Flat profiles (no edge in reach) keep their original position
+    t_edge = np.where(b >= EDGE_MIN_GRAD, t_edge, 0)
+    return (p + normal * t_edge[:, None]).astype(np.float32).reshape(-1, 1, 2)
+
+
 # ── PCA measurement (minAreaRect = closed-form PCA for 2-D point clouds) ─────
-def _measure_pca(contour: np.ndarray, mm_per_pixel: float, gray: np.ndarray) -> dict:
+def _measure_pca(contour: np.ndarray, mm_per_pixel: float, gray: np.ndarray,
+                 refine: bool = True) -> dict:
     """
     Compute width, height, and area using the object's PRINCIPAL AXES.
     than the axis-aligned bounding rectangle.
@@ -101,6 +239,9 @@ def _measure_pca(contour: np.ndarray, mm_per_pixel: float, gray: np.ndarray) ->
       ≈ 0.78 → square
       < 0.50 → elongated / irregular
 
+    `refine=False` (preview quality) skips polygon corner refinement and
+    refines round-shape edges on a sparser point set.
+
     Thresholds:
       circ > 0.80  AND  PCA aspect-ratio < 1.25  → 'circle'
       circ > 0.72                                  → 'ellipse'
@@ -157,7 +298,7 @@ def _measure_pca(contour: np.ndarray, mm_per_pixel: float, gray: np.ndarray) ->
     # ── Sub-pixel refinement for polygon corners ──
     # If the object is a polygon (usually rectangle), we refine its vertices.
     approx_sub = None
-    if shape_type == 'polygon':
+    if shape_type == 'polygon' and refine:
         approx_sub = _refine_points_subpixel(gray, approx)
 
     # ── Expand contour to correct for Canny inward bias ──────────────────
@@ -167,10 +308,13 @@ def _measure_pca(contour: np.ndarray, mm_per_pixel: float, gray: np.ndarray) ->
     contour_exp = _expand_contour(contour, pixels=dilation_px)
 
     # ── Sub-pixel refinement for round shape edge-points ──
-    # Feed fitEllipse a more precise set of points.
+    # Feed fitEllipse a more precise set of points, snapped onto the edge
+    # along each contour normal.
     contour_exp_sub = contour_exp.astype(np.float32)
     if shape_type in ('circle', 'ellipse'):
-        contour_exp_sub = _refine_points_subpixel(gray, contour_exp)
+        contour_exp_sub = _refine_edges_normal(
+            gray, contour_exp,
+            decimate=EDGE_DECIMATE if refine else PREVIEW_EDGE_DECIMATE)
 
     # Re-run minAreaRect on the REFINED DENSE contour for max accuracy.
     # (Previously using approximated points caused rounded-corner bias).
@@ -270,8 +414,22 @@ def _convexity_ratio(c: np.ndarray) -> float:
     return hull_a / max(cont_a, 1)
 
 
+# ── Pipeline quality levels ───────────────────────────────────────────────────
+#   precise – full accuracy: illumination normalisation, all six detection
+#             strategies, sub-pixel corner / edge refinement.
+#   preview – live-preview speed (±1 mm is fine): no illumination pass, the
+#             two plain-Canny strategies only, no polygon corner refinement,
+#             round edges refined on every 8th point.  Contour expansion and
+#             round-edge refinement stay — without them diameters read ~2 mm
+#             large, and both are cheap.
+QUALITY_LEVELS = ('precise', 'preview')
+
+
 # ── Main entry point ──────────────────────────────────────────────────────────
-def auto_detect_objects(warped: np.ndarray, mm_per_pixel: float) -> dict:
+def auto_detect_objects(warped: np.ndarray, mm_per_pixel: float,
+                        quality: str = 'precise',
+                        illum_cache: dict | None = None,
+                        on_stage=None) -> dict:
     """
     Detect ALL distinct objects on the A4 sheet and measure each one.
 
@@ -285,41 +443,71 @@ def auto_detect_objects(warped: np.ndarray, mm_per_pixel: float) -> dict:
                          only the contour with the best convexity score is kept
     ⑥ Smaller closing  – iterations=1 to avoid bridging gaps between objects
 
+    `quality` selects 'precise' (default) or the cheaper 'preview' pipeline
+    (see QUALITY_LEVELS).  `illum_cache` is an optional per-session dict
+    that lets an unchanged scene reuse the previous illumination field.
+    `on_stage(name, ms)`, if given, is called as each stage finishes.
+
     Returns
     -------
     { 'objects': [{id, polygon_points, centroid, width_mm, height_mm,
                    area_mm2, angle_deg}, …],
-      'count': N }
+      'count': N,
+      'pipeline': {'quality': …, 'stages_ms': {stage: ms, …}} }
     """
+    if quality not in QUALITY_LEVELS:
+        raise ValueError(f"Unknown quality '{quality}'; expected one of {QUALITY_LEVELS}.")
+    precise   = quality == 'precise'
+    stages_ms = {}
+    t0 = time.perf_counter()
+
+    def _stage_done(name):
+        nonlocal t0
+        stages_ms[name] = (time.perf_counter() - t0) * 1000
+        if on_stage is not None:
+            on_stage(name, round(stages_ms[name], 2))
+        t0 = time.perf_counter()
+
     gray     = cv2.cvtColor(warped, cv2.COLOR_BGR2GRAY)
     h, w     = warped.shape[:2]
     img_area = h * w
 
     # Shadow-normalised channel
-    gray_norm = _normalise_illumination(gray)
+    if precise:
+        gray_norm = _normalise_illumination(gray, illum_cache)
+        account("illumination", gray, gray_norm)
+        _stage_done('illumination')
 
     # ── Preprocessing strategies ───────────────────────────────────────────
     def _canny(src, blur_k, lo, hi):
         return cv2.Canny(cv2.GaussianBlur(src, (blur_k, blur_k), 0), lo, hi)
 
-    strategies = [
-        lambda: _canny(gray_norm, 5,  50, 150),   # shadow-normalised standard
-        lambda: _canny(gray_norm, 9,  40, 120),   # shadow-normalised heavier
-        lambda: _canny(gray,      5,  50, 150),   # original, standard
-        lambda: _canny(gray,      11, 30, 100),   # original, heavier blur
-        lambda: cv2.Canny(cv2.bilateralFilter(gray, 9, 75, 75), 40, 120),
-        lambda: cv2.adaptiveThreshold(
-            cv2.GaussianBlur(gray_norm, (7, 7), 0), 255,
-            cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 15, 4),
-    ]
+    if precise:
+        strategies = [
+            lambda: _canny(gray_norm, 5,  50, 150),   # shadow-normalised standard
+            lambda: _canny(gray_norm, 9,  40, 120),   # shadow-normalised heavier
+            lambda: _canny(gray,      5,  50, 150),   # original, standard
+            lambda: _canny(gray,      11, 30, 100),   # original, heavier blur
+            lambda: cv2.Canny(cv2.bilateralFilter(gray, 9, 75, 75), 40, 120),
+            lambda: cv2.adaptiveThreshold(
+                cv2.GaussianBlur(gray_norm, (7, 7), 0), 255,
+                cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 15, 4),
+        ]
+    else:
+        strategies = [
+            lambda: _canny(gray,      5,  50, 150),   # original, standard
+            lambda: _canny(gray,      11, 30, 100),   # original, heavier blur
+        ]
 
     kernel = np.ones((3, 3), np.uint8)
     all_candidates = []
+    strategy_peak  = 0
 
     for strategy in strategies:
         try:
             edges   = strategy()
             closed  = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, kernel, iterations=1)
+            strategy_peak = max(strategy_peak, edges.nbytes + closed.nbytes)
             cnts, _ = cv2.findContours(closed, cv2.RETR_EXTERNAL,
                                        cv2.CHAIN_APPROX_SIMPLE)
             for c in cnts:
@@ -333,6 +521,11 @@ def auto_detect_objects(warped: np.ndarray, mm_per_pixel: float) -> dict:
         except Exception:
             continue
 
+    # Intermediates live one strategy at a time; contours accumulate
+    account("strategies", strategy_peak)
+    account("candidates", *all_candidates)
+    _stage_done('strategies')
+
     if not all_candidates:
         raise Exception(
             "No objects detected inside the A4 frame. "
@@ -359,11 +552,19 @@ def auto_detect_objects(warped: np.ndarray, mm_per_pixel: float) -> dict:
     # ── Measure each object with PCA (minAreaRect) ─────────────────────────
     objects = []
     for i, c in enumerate(deduped[:10]):   # cap at 10 objects per frame
-        obj = _measure_pca(c, mm_per_pixel, gray)
+        obj = _measure_pca(c, mm_per_pixel, gray, refine=precise)
         obj['id'] = i
         objects.append(obj)
+    _stage_done('measure')
 
-    return {'objects': objects, 'count': len(objects)}
+    return {
+        'objects':  objects,
+        'count':    len(objects),
+        'pipeline': {
+            'quality':   quality,
+            'stages_ms': {k: round(v, 2) for k, v in stages_ms.items()},
+        },
+    }
 
 
 # ── Backwards-compat shim for any code that used auto_detect_object ──────────
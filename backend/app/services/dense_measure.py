@@ -0,0 +1,192 @@
+# app/services/dense_measure.py
+"""
+Dense-scene mode: count and measure hundreds of small parts (washers,
+screws, …) on the A4 sheet in one pass.
+
+Unlike `auto_detect_objects` (six edge strategies, ≤ 10 objects, a full
+per-contour measurement each), this segments the whole sheet ONCE and
+derives every measurement from per-component pixel statistics with
+NumPy — the cost is O(pixels), not O(objects × Python calls).
+
+  1. Divide by the sheet background, Otsu + isodata threshold (parts darker than
+     the sheet).
+  2. connectedComponentsWithStats → area, bounding box, centroid.
+  3. Second-order moments via np.bincount → principal axis per component.
+  4. Pixel projections onto candidate axes (principal + 5° steps), min/max
+     per component via np.minimum/maximum.reduceat → smallest oriented box
+     gives length × width.
+
+Touching parts merge into one component; spread them out for counting.
+Parts wider than ~50 mm (the background kernel) belong in the normal mode.
+"""
+import cv2
+import numpy as np
+
+MIN_AREA_PX   = 25      # smaller components are noise
+MAX_AREA_FRAC = 0.25    # larger components are shadows / sheet remnants
+HIST_BINS     = 10
+BG_DOWNSCALE  = 8       # sheet background estimated at 1/8 resolution …
+BG_KERNEL     = 25      # … with a 25 px max filter there (200 px ≈ 52 mm full-res)
+ANGLE_STEP_DEG = 5      # min-area box search step
+BOX_MARGIN     = 0.01   # relative box-area gain needed to leave the moment axis
+# Pixel-centre extent → edge-to-edge extent.  Axis-aligned edges need +1 px
+# (centres sit ½ px inside), rotated edges ~+0.2 px (the staircase puts
+# some centre almost on the edge); ½ px keeps both within ±0.5 px.
+EDGE_PAD_PX   = 0.5
+
+
+def _sheet_background(gray: np.ndarray) -> np.ndarray:
+    """
+    Sheet brightness with the parts removed: grey-level dilation (local max)
+    on a downsampled frame erases every dark part narrower than the kernel,
+    then a light blur + upsample gives a smooth field.  (The Gaussian field
+    used by the edge pipeline would flatten the inside of larger parts.)
+    """
+    h, w  = gray.shape
+    small = cv2.resize(gray, (max(w // BG_DOWNSCALE, 1), max(h // BG_DOWNSCALE, 1)),
+                       interpolation=cv2.INTER_AREA)
+    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (BG_KERNEL, BG_KERNEL))
+    small  = cv2.GaussianBlur(cv2.dilate(small, kernel), (0, 0), BG_KERNEL / 4)
+    return cv2.resize(small, (w, h), interpolation=cv2.INTER_LINEAR)
+
+
+def _segment(gray: np.ndarray) -> np.ndarray:
+    """
+    Binary mask (255 = part) from one global threshold on the flattened sheet.
+
+    Otsu sits close to the (dominant) sheet level, which grows every part by
+    ~0.5 px per side; one isodata step moves the threshold to the midpoint
+    between the part and sheet means, i.e. onto the 50 %-coverage edge.
+    """
+    flat = cv2.divide(gray, _sheet_background(gray), scale=200)
+    t, mask = cv2.threshold(flat, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    fg = mask > 0
+    if fg.any() and not fg.all():
+        t = 0.5 * (flat[fg].mean() + flat[~fg].mean())
+        _, mask = cv2.threshold(flat, t, 255, cv2.THRESH_BINARY_INV)
+    return cv2.morphologyEx(mask, cv2.MORPH_OPEN, np.ones((3, 3), np.uint8))
+
+
+def _distribution(values: np.ndarray) -> dict:
+    if values.size == 0:
+        return {}
+    p10, p50, p90 = np.percentile(values, [10, 50, 90])
+    counts, edges = np.histogram(values, bins=HIST_BINS)
+    return {
+        'mean': round(float(values.mean()), 2),
+        'std':  round(float(values.std()), 2),
+        'min':  round(float(values.min()), 2),
+        'p10':  round(float(p10), 2),
+        'p50':  round(float(p50), 2),
+        'p90':  round(float(p90), 2),
+        'max':  round(float(values.max()), 2),
+        'histogram': {'counts': counts.tolist(),
+                      'edges':  np.round(edges, 2).tolist()},
+    }
+
+
+def dense_detect_objects(warped: np.ndarray, mm_per_pixel: float) -> dict:
+    """
+    Segment and measure every part on the warped A4 frame.
+
+    Returns
+    -------
+    { 'objects': [{id, centroid, bbox, length_mm, width_mm, area_mm2,
+                   angle_deg}, …],
+      'count': N,
+      'stats': {'length_mm': {...}, 'width_mm': {...}, 'area_mm2': {...}} }
+    where each stats entry has mean/std/min/p10/p50/p90/max + histogram.
+    """
+    gray = cv2.cvtColor(warped, cv2.COLOR_BGR2GRAY)
+    h, w = gray.shape
+    mask = _segment(gray)
+
+    n, labels, cc, centroids = cv2.connectedComponentsWithStats(mask, connectivity=8)
+
+    # ── Component filter (label 0 = background) ─────────────────────────
+    x, y, bw, bh, area = (cc[:, i] for i in range(5))
+    keep = (area >= MIN_AREA_PX) & (area <= MAX_AREA_FRAC * h * w)
+    keep &= (x > 0) & (y > 0) & (x + bw < w) & (y + bh < h)   # off-sheet borders
+    keep[0] = False
+    remap = np.zeros(n, dtype=np.int32)
+    remap[keep] = np.arange(1, keep.sum() + 1)
+    m = int(keep.sum())
+    if m == 0:
+        return {'objects': [], 'count': 0, 'stats': {}}
+
+    # ── Foreground pixels grouped by (remapped) component ───────────────
+    lab = remap[labels]
+    py, px = np.nonzero(lab)
+    lab = lab[py, px]
+    order = np.argsort(lab, kind='stable')
+    lab, px, py = lab[order], px[order].astype(np.float64), py[order].astype(np.float64)
+    starts = np.searchsorted(lab, np.arange(1, m + 1))
+
+    # ── Principal axes from central second moments ─────────────────────
+    cnt = area[keep].astype(np.float64)
+    cx, cy = centroids[keep, 0], centroids[keep, 1]
+    dx, dy = px - cx[lab - 1], py - cy[lab - 1]
+    mu20 = np.bincount(lab, dx * dx, minlength=m + 1)[1:] / cnt
+    mu02 = np.bincount(lab, dy * dy, minlength=m + 1)[1:] / cnt
+    mu11 = np.bincount(lab, dx * dy, minlength=m + 1)[1:] / cnt
+    theta_pca = 0.5 * np.arctan2(2 * mu11, mu20 - mu02)
+
+    # ── Oriented extents: min-area box over candidate angles ───────────
+    # The moment axis is exact for elongated parts but arbitrary for
+    # squares / hexagons, so every component also tries ANGLE_STEP_DEG
+    # steps over 0-90° and keeps the smallest box — a discrete rotating
+    # calipers, one vectorised projection of all pixels per angle.
+    best_area = np.full(m, np.inf)      # first candidate (moment axis) always wins
+    along_px  = np.zeros(m)
+    across_px = np.zeros(m)
+    theta     = np.zeros(m)
+    candidates = [theta_pca] + [np.full(m, a) for a in
+                                np.radians(np.arange(0, 90, ANGLE_STEP_DEG))]
+    for th in candidates:
+        ux, uy = np.cos(th)[lab - 1], np.sin(th)[lab - 1]
+        along  = dx * ux + dy * uy
+        across = dy * ux - dx * uy
+        ext_a = np.maximum.reduceat(along, starts)  - np.minimum.reduceat(along, starts)  + EDGE_PAD_PX
+        ext_c = np.maximum.reduceat(across, starts) - np.minimum.reduceat(across, starts) + EDGE_PAD_PX
+        # Grid angles must beat the moment axis by 1 % (it is exact otherwise)
+        better = ext_a * ext_c < best_area * (1 - BOX_MARGIN)
+        best_area = np.where(better, ext_a * ext_c, best_area)
+        along_px  = np.where(better, ext_a, along_px)
+        across_px = np.where(better, ext_c, across_px)
+        theta     = np.where(better, th, theta)
+
+    # Length = longer side; angle follows it
+    swap = across_px > along_px
+    length_px = np.where(swap, across_px, along_px)
+    width_px  = np.where(swap, along_px, across_px)
+    theta     = np.where(swap, theta + np.pi / 2, theta)
+
+    length_mm = length_px * mm_per_pixel
+    width_mm  = width_px  * mm_per_pixel
+    area_mm2  = cnt * mm_per_pixel ** 2
+    angle_deg = np.degrees(theta) % 180
+
+    # Largest parts first, same as the detailed mode
+    rank = np.argsort(-cnt, kind='stable')
+    boxes = np.stack([x[keep], y[keep], bw[keep], bh[keep]], axis=1)[rank].tolist()
+    cents = np.round(np.stack([cx, cy], axis=1)[rank], 1).tolist()
+    lens  = np.round(length_mm[rank], 2).tolist()
+    wids  = np.round(width_mm[rank], 2).tolist()
+    areas = np.round(area_mm2[rank], 2).tolist()
+    angs  = np.round(angle_deg[rank], 1).tolist()
+
+    objects = [
+        {'id': i, 'centroid': c, 'bbox': b, 'length_mm': l, 'width_mm': wd,
+         'area_mm2': a, 'angle_deg': g}
+        for i, (c, b, l, wd, a, g) in enumerate(zip(cents, boxes, lens, wids, areas, angs))
+    ]
+
+    return {
+        'objects': objects,
+        'count':   m,
+        'stats': {
+            'length_mm': _distribution(length_mm),
+            'width_mm':  _distribution(width_mm),
+            'area_mm2':  _distribution(area_mm2),
+        },
+    }
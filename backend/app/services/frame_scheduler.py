@@ -0,0 +1,116 @@
+# app/services/frame_scheduler.py
+"""
+Per-session backpressure for live frames ("latest frame wins").
+
+Each session gets at most ONE frame in flight plus ONE pending slot.
+When a newer frame arrives while one is already pending, the older
+pending frame is dropped (its request fails with FrameDropped) and the
+newer one takes the slot.  End-to-end latency therefore stays bounded by
+roughly one processing time, and no CPU is spent on stale frames.
+
+The work itself runs in the threadpool so the event loop stays free to
+accept (and drop) newer frames while one is being processed.
+
+Per-session drop counts (for /admin/frames) are kept for at most
+DROPPED_TRACKED sessions; when a new session would exceed that, the
+session with the fewest drops is forgotten, so the table keeps the worst
+offenders without growing with every session id ever seen.
+"""
+import asyncio
+import threading
+
+from starlette.concurrency import run_in_threadpool
+
+DROPPED_TRACKED = 256   # sessions whose drop counts are kept
+
+
+class FrameDropped(Exception):
+    """A newer frame for the same session replaced this one before it ran."""
+
+
+class _SessionSlot:
+    __slots__ = ("busy", "pending")
+
+    def __init__(self):
+        self.busy    = False                    # a frame is being processed
+        self.pending: asyncio.Future | None = None
+
+
+_slots:   dict[str, _SessionSlot] = {}
+_dropped: dict[str, int] = {}                   # session_id → frames dropped
+_totals = {"submitted": 0, "processed": 0, "dropped": 0, "failed": 0}
+_lock = threading.Lock()
+
+
+def _count(key: str, session_id: str | None = None):
+    with _lock:
+        _totals[key] += 1
+        if session_id is not None:
+            if session_id not in _dropped and len(_dropped) >= DROPPED_TRACKED:
+                del _dropped[min(_dropped, key=_dropped.get)]
+            _dropped[session_id] = _dropped.get(session_id, 0) + 1
+
+
+def _release(session_id: str, slot: _SessionSlot):
+    """
+    Hand the slot to the pending frame, or free it.  A pending future that
+    was already cancelled (client gone, cleanup not yet run) is skipped.
+    """
+    nxt, slot.pending = slot.pending, None
+    if nxt is not None and not nxt.done():
+        nxt.set_result(None)                    # busy stays True → handoff
+    else:
+        slot.busy = False
+        _slots.pop(session_id, None)
+
+
+async def submit(session_id: str, fn, *args):
+    """
+    Run `fn(*args)` in the threadpool under the session's frame policy.
+    Raises FrameDropped if a newer frame superseded this one while it waited.
+    """
+    _count("submitted")
+    slot = _slots.setdefault(session_id, _SessionSlot())
+
+    if slot.busy:
+        # A cancelled pending frame whose cleanup hasn't run yet is simply replaced
+        if slot.pending is not None and not slot.pending.done():
+            slot.pending.set_exception(FrameDropped())
+            _count("dropped", session_id)
+        fut = asyncio.get_running_loop().create_future()
+        slot.pending = fut
+        try:
+            await fut
+        except asyncio.CancelledError:
+            # Client went away: vacate the pending slot, or pass on the turn
+            # we were just handed so the session doesn't stall.
+            if slot.pending is fut:
+                slot.pending = None
+            elif fut.done() and not fut.cancelled() and fut.exception() is None:
+                _release(session_id, slot)
+            raise
+    else:
+        slot.busy = True
+
+    try:
+        result = await run_in_threadpool(fn, *args)
+    except BaseException:
+        _count("failed")
+        raise
+    finally:
+        _release(session_id, slot)
+    _count("processed")
+    return result
+
+
+def stats(top: int = 10) -> dict:
+    """Totals plus the sessions with the most dropped frames."""
+    with _lock:
+        worst = sorted(_dropped.items(), key=lambda t: t[1], reverse=True)[:top]
+        totals = dict(_totals)
+    return {
+        **totals,
+        "in_flight":   sum(1 for s in _slots.values() if s.busy),
+        "pending":     sum(1 for s in _slots.values() if s.pending is not None),
+        "top_dropped": [{"session_id": sid, "dropped": n} for sid, n in worst],
+    }
@@ -0,0 +1,198 @@
+# app/services/job_queue.py
+"""
+Background jobs for work too slow to hold an HTTP connection open
+(large high-resolution uploads behind a proxy with a gateway timeout).
+
+submit() returns a Job immediately.  A fixed ThreadPoolExecutor
+(VM_JOB_WORKERS threads) runs it as fn(*args, on_stage=callback).  The
+callback appends {"event": "stage", "stage", "ms"} to the job's event list,
+which clients read by polling or over server-sent events.
+
+Until it finishes, a job holds its arguments — for uploads the raw file
+bytes.  At most VM_JOB_MAX_ACTIVE jobs may be queued or running, and
+together they may hold at most VM_JOB_MAX_QUEUED_BYTES of arguments
+(default 256 MB): submit() raises QueueFull past either limit, and
+JobTooLarge for a single payload that could never fit.
+
+Finished jobs are kept for VM_JOB_TTL_S seconds, and for at most
+VM_JOB_MAX_RETAINED jobs (oldest evicted first).  Each retained result
+holds the warped frame as a base64 PNG (~1.4 MB for 800×1131), so the
+default of 32 caps results at roughly 45 MB.  Queued and retained bytes
+are reported by stats() / memory() and GET /api/admin/memory.
+Expired jobs are swept lazily on submit / lookup.
+"""
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services.memory_stats import sizeof
+
+JOB_WORKERS  = int(os.getenv("VM_JOB_WORKERS", "2"))
+JOB_TTL_S    = float(os.getenv("VM_JOB_TTL_S", "600"))
+MAX_RETAINED = int(os.getenv("VM_JOB_MAX_RETAINED", "32"))   # finished jobs kept
+MAX_ACTIVE   = int(os.getenv("VM_JOB_MAX_ACTIVE", "64"))     # queued + running jobs
+MAX_QUEUED_BYTES = int(os.getenv("VM_JOB_MAX_QUEUED_BYTES", str(256 * 2**20)))
+
+TERMINAL = ("done", "failed")
+
+
+class QueueFull(Exception):
+    """Too many jobs (or argument bytes) queued or running; retry later."""
+
+
+class JobTooLarge(Exception):
+    """One job's arguments exceed MAX_QUEUED_BYTES on their own."""
+
+
+class Job:
+    __slots__ = ("id", "kind", "status", "stage", "created", "finished",
+                 "events", "result", "error", "nbytes", "queued_bytes")
+
+    def __init__(self, kind: str, queued_bytes: int = 0):
+        self.id       = uuid.uuid4().hex
+        self.kind     = kind
+        self.status   = "queued"                 # queued → running → done | failed
+        self.stage    = None                     # last finished stage
+        self.created  = time.time()
+        self.finished = None
+        self.events: list[dict] = [{"event": "status", "status": "queued"}]
+        self.result   = None
+        self.error    = None                     # {"status_code", "detail"}
+        self.nbytes   = 0                        # payload bytes held by `result`
+        self.queued_bytes = queued_bytes         # argument bytes held until finished
+
+    def to_dict(self, include_result: bool = True) -> dict:
+        out = {
+            "job_id":   self.id,
+            "kind":     self.kind,
+            "status":   self.status,
+            "stage":    self.stage,
+            "created":  self.created,
+            "finished": self.finished,
+            "stages":   [{"stage": e["stage"], "ms": e["ms"]}
+                         for e in self.events if e["event"] == "stage"],
+        }
+        if self.error is not None:
+            out["error"] = self.error
+        if include_result and self.result is not None:
+            out["result"] = self.result
+        return out
+
+
+_jobs: dict[str, Job] = {}                       # insertion order = submit order
+_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+_totals = {"submitted": 0, "done": 0, "failed": 0, "rejected": 0, "expired": 0}
+
+
+def _payload_bytes(obj) -> int:
+    """Bytes of the strings / arrays inside a result (the base64 frame dominates)."""
+    if isinstance(obj, dict):
+        return sum(_payload_bytes(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(_payload_bytes(v) for v in obj)
+    return 0 if isinstance(obj, int) else sizeof(obj)
+
+
+def _sweep():
+    """Drop finished jobs past their TTL, then the oldest beyond MAX_RETAINED."""
+    now = time.time()
+    with _lock:
+        finished = [j for j in _jobs.values() if j.status in TERMINAL]
+        stale = {j.id for j in finished if now - j.finished > JOB_TTL_S}
+        kept  = [j for j in finished if j.id not in stale]
+        stale.update(j.id for j in kept[:max(len(kept) - MAX_RETAINED, 0)])
+        for job_id in stale:
+            del _jobs[job_id]
+        _totals["expired"] += len(stale)
+
+
+def _run(job: Job, fn, args):
+    def on_stage(name: str, ms: float):
+        job.stage = name
+        job.events.append({"event": "stage", "stage": name, "ms": ms})
+
+    job.status = "running"
+    job.events.append({"event": "status", "status": "running"})
+    try:
+        result = fn(*args, on_stage=on_stage)
+    except Exception as e:
+        # HTTPException-style errors keep their status code and detail
+        job.error = {"status_code": getattr(e, "status_code", 500),
+                     "detail":      getattr(e, "detail", str(e))}
+        status = "failed"
+    else:
+        job.result = result
+        job.nbytes = _payload_bytes(result)
+        status = "done"
+    job.finished = time.time()
+    job.queued_bytes = 0                         # the worker drops `args` on return
+    # Final event before the status flips, so a reader that sees a terminal
+    # status has already got every event
+    job.events.append({"event": "status", "status": status})
+    job.status = status
+    with _lock:
+        _totals[status] += 1
+
+
+def submit(kind: str, fn, *args) -> Job:
+    """
+    Queue fn(*args, on_stage=…) on the worker pool and return its Job.
+    Raises JobTooLarge when the arguments alone exceed MAX_QUEUED_BYTES, and
+    QueueFull when MAX_ACTIVE jobs are already queued or running or their
+    arguments would pass MAX_QUEUED_BYTES.
+    """
+    _sweep()
+    job = Job(kind, _payload_bytes(args))
+    if job.queued_bytes > MAX_QUEUED_BYTES:
+        with _lock:
+            _totals["rejected"] += 1
+        raise JobTooLarge()
+    with _lock:
+        active = [j for j in _jobs.values() if j.status not in TERMINAL]
+        queued_bytes = sum(j.queued_bytes for j in active)
+        if (len(active) >= MAX_ACTIVE
+                or queued_bytes + job.queued_bytes > MAX_QUEUED_BYTES):
+            _totals["rejected"] += 1
+            raise QueueFull()
+        _jobs[job.id] = job
+        _totals["submitted"] += 1
+    _executor.submit(_run, job, fn, args)
+    return job
+
+
+def get(job_id: str) -> Job | None:
+    _sweep()
+    with _lock:
+        return _jobs.get(job_id)
+
+
+def memory() -> dict:
+    """
+    Argument bytes held by unfinished jobs, and the finished jobs retained
+    with the result bytes they hold.
+    """
+    with _lock:
+        active   = [j for j in _jobs.values() if j.status not in TERMINAL]
+        finished = [j for j in _jobs.values() if j.status in TERMINAL]
+        return {
+            "active":           len(active),
+            "max_active":       MAX_ACTIVE,
+            "queued_bytes":     sum(j.queued_bytes for j in active),
+            "max_queued_bytes": MAX_QUEUED_BYTES,
+            "retained":         len(finished),
+            "max_retained":     MAX_RETAINED,
+            "retained_bytes":   sum(j.nbytes for j in finished),
+        }
+
+
+def stats() -> dict:
+    with _lock:
+        by_status = {"queued": 0, "running": 0, "done": 0, "failed": 0}
+        for j in _jobs.values():
+            by_status[j.status] += 1
+        totals = dict(_totals)
+    return {**totals, "workers": JOB_WORKERS, "ttl_s": JOB_TTL_S,
+            "current": by_status, **memory()}
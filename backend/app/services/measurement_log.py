@@ -0,0 +1,283 @@
+# app/services/measurement_log.py
+"""
+Append-only measurement history in an embedded SQLite file (VM_HISTORY_DB).
+
+Request handlers never touch the database: `record()` only enqueues rows
+(put_nowait on a bounded queue).  One daemon writer thread drains the queue
+and inserts whole batches with executemany — one transaction per
+≤ BATCH_MAX rows or per FLUSH_S seconds, whichever comes first.  If the
+writer falls more than QUEUE_MAX rows behind, new rows are dropped and
+counted instead of blocking a request.
+
+Rows are never updated or deleted by the API.  Readers:
+  iter_export() – yields rows in chunks of EXPORT_CHUNK (constant memory)
+  aggregate()   – mean / percentiles per session or per time window,
+                  one group in memory at a time
+"""
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+DB_PATH      = os.getenv("VM_HISTORY_DB", "history.db")
+BATCH_MAX    = 500      # rows per insert transaction
+FLUSH_S      = 0.5      # max time a row waits in the queue
+QUEUE_MAX    = 50_000   # rows buffered before record() starts dropping
+EXPORT_CHUNK = 1000     # rows fetched per cursor round-trip
+PERCENTILES  = (10, 50, 90)
+
+COLUMNS = ("id", "ts", "session_id", "endpoint", "object_id", "shape_type",
+           "width_mm", "height_mm", "area_mm2", "distance_mm")
+METRICS = ("width_mm", "height_mm", "area_mm2", "distance_mm")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS measurements (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts          REAL    NOT NULL,
+    session_id  TEXT    NOT NULL,
+    endpoint    TEXT    NOT NULL,
+    object_id   INTEGER,
+    shape_type  TEXT,
+    width_mm    REAL,
+    height_mm   REAL,
+    area_mm2    REAL,
+    distance_mm REAL
+);
+CREATE INDEX IF NOT EXISTS idx_measurements_ts      ON measurements (ts);
+CREATE INDEX IF NOT EXISTS idx_measurements_session ON measurements (session_id, ts);
+"""
+_INSERT = ("INSERT INTO measurements (ts, session_id, endpoint, object_id, shape_type, "
+           "width_mm, height_mm, area_mm2, distance_mm) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)")
+
+_queue: queue.Queue = queue.Queue(maxsize=QUEUE_MAX)
+_writer: threading.Thread | None = None
+_start_lock = threading.Lock()
+_totals = {"queued": 0, "written": 0, "dropped": 0, "batches": 0, "errors": 0}
+_lock = threading.Lock()
+
+
+def _count(key: str, n: int = 1):
+    with _lock:
+        _totals[key] += n
+
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")          # readers don't block the writer
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+# ── Writer ────────────────────────────────────────────────────────────────────
+def _write_loop():
+    """
+    Owns the only write connection.  Opening it (and creating the schema)
+    happens here, never in a request; if that or an insert fails the batch
+    is discarded (one `errors`, its rows under `dropped`) and the next batch
+    retries.
+    """
+    conn = None
+    while True:
+        batch = [_queue.get()]                       # block for the first row
+        deadline = time.monotonic() + FLUSH_S
+        while len(batch) < BATCH_MAX:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(_queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        try:
+            if conn is None:
+                conn = _connect()
+            with conn:
+                conn.executemany(_INSERT, batch)
+            _count("written", len(batch))
+            _count("batches")
+        except (sqlite3.Error, OSError):
+            _count("errors")
+            _count("dropped", len(batch))
+            if conn is not None:
+                conn.close()
+                conn = None
+        finally:
+            for _ in batch:
+                _queue.task_done()
+
+
+def _ensure_writer():
+    global _writer
+    if _writer is not None:
+        return
+    with _start_lock:
+        if _writer is None:
+            _writer = threading.Thread(target=_write_loop, name="measurement-log",
+                                       daemon=True)
+            _writer.start()
+            atexit.register(flush)
+
+
+def flush():
+    """Block until every row recorded so far is committed."""
+    if _writer is not None:
+        _queue.join()
+
+
+# ── Recording ─────────────────────────────────────────────────────────────────
+def _row(ts, session_id, endpoint, object_id=None, shape_type=None,
+         width_mm=None, height_mm=None, area_mm2=None, distance_mm=None) -> tuple:
+    return (ts, session_id, endpoint, object_id, shape_type,
+            width_mm, height_mm, area_mm2, distance_mm)
+
+
+def record(session_id: str, endpoint: str, measurements: list[dict]):
+    """
+    Queue one row per measurement; never blocks and never raises — history
+    is best-effort and must not fail the measurement that produced it.
+    Each dict may carry any of object_id, shape_type, width_mm, height_mm,
+    area_mm2, distance_mm.
+    """
+    try:
+        _ensure_writer()
+        ts = time.time()
+        for m in measurements:
+            try:
+                _queue.put_nowait(_row(ts, session_id, endpoint, **m))
+                _count("queued")
+            except queue.Full:
+                _count("dropped")
+    except Exception:
+        _count("errors")
+
+
+def object_rows(objects: list[dict]) -> list[dict]:
+    """Rows for `auto_detect_objects` / `dense_detect_objects` results."""
+    rows = []
+    for o in objects:
+        if "length_mm" in o:                         # dense mode: length × width
+            width, height = o["length_mm"], o["width_mm"]
+        else:
+            width, height = o["width_mm"], o["height_mm"]
+        rows.append({
+            "object_id":  o.get("id"),
+            "shape_type": o.get("shape_type", "part"),
+            "width_mm":   width,
+            "height_mm":  height,
+            "area_mm2":   o.get("area_mm2"),
+        })
+    return rows
+
+
+def stats() -> dict:
+    with _lock:
+        totals = dict(_totals)
+    return {**totals, "backlog": _queue.qsize(), "db_path": DB_PATH}
+
+
+# ── Readers ───────────────────────────────────────────────────────────────────
+def _where(session_id: str | None, since: float | None, until: float | None):
+    clauses, params = [], []
+    if session_id is not None:
+        clauses.append("session_id = ?")
+        params.append(session_id)
+    if since is not None:
+        clauses.append("ts >= ?")
+        params.append(since)
+    if until is not None:
+        clauses.append("ts < ?")
+        params.append(until)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def iter_export(session_id: str | None = None, since: float | None = None,
+                until: float | None = None):
+    """Yield lists of row tuples (COLUMNS order), EXPORT_CHUNK at a time."""
+    flush()
+    if not os.path.exists(DB_PATH):
+        return
+    where, params = _where(session_id, since, until)
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    try:
+        cur = conn.execute(f"SELECT {', '.join(COLUMNS)} FROM measurements{where} ORDER BY id",
+                           params)
+        while True:
+            rows = cur.fetchmany(EXPORT_CHUNK)
+            if not rows:
+                break
+            yield rows
+    finally:
+        conn.close()
+
+
+def _summarise(values: np.ndarray) -> dict | None:
+    values = values[~np.isnan(values)]
+    if values.size == 0:
+        return None
+    pcts = np.percentile(values, PERCENTILES)
+    return {
+        "count": int(values.size),
+        "mean":  round(float(values.mean()), 2),
+        **{f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, pcts)},
+    }
+
+
+def _group(group_by: str, window_s: float, key, values: np.ndarray) -> dict:
+    group = ({"session_id": key} if group_by == "session" else
+             {"window_start": key * window_s, "window_end": (key + 1) * window_s})
+    group["rows"] = len(values)
+    for j, metric in enumerate(METRICS):
+        summary = _summarise(values[:, j])
+        if summary is not None:
+            group[metric] = summary
+    return group
+
+
+def aggregate(group_by: str = "session", window_s: float = 3600,
+              session_id: str | None = None, since: float | None = None,
+              until: float | None = None) -> list[dict]:
+    """
+    Mean and PERCENTILES of every metric per group.
+    group_by = "session" (one group per session_id) or "window" (fixed
+    `window_s` buckets of the timestamp).  SQLite returns the rows sorted by
+    group; each group is summarised and released as soon as the cursor
+    passes its last row, so memory is bounded by the largest group rather
+    than the table.
+    """
+    flush()
+    if not os.path.exists(DB_PATH):
+        return []
+    where, params = _where(session_id, since, until)
+    key_sql = "session_id" if group_by == "session" else "CAST(ts / ? AS INTEGER)"
+    key_params = [] if group_by == "session" else [window_s]
+    sql = (f"SELECT {key_sql}, {', '.join(METRICS)} FROM measurements{where} "
+           f"ORDER BY 1")
+
+    groups = []
+    key, parts = None, []                            # current group's value chunks
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        cur = conn.execute(sql, key_params + params)
+        while rows := cur.fetchmany(EXPORT_CHUNK * 10):
+            keys   = [r[0] for r in rows]
+            values = np.array([r[1:] for r in rows], dtype=np.float64)   # None → NaN
+            # Rows arrive sorted by key → split the chunk where the key changes
+            key_arr = np.asarray(keys)
+            cuts = np.concatenate(([0], np.flatnonzero(key_arr[1:] != key_arr[:-1]) + 1,
+                                   [len(keys)]))
+            for start, end in zip(cuts[:-1].tolist(), cuts[1:].tolist()):
+                if keys[start] != key:               # previous group is complete
+                    if parts:
+                        groups.append(_group(group_by, window_s, key, np.concatenate(parts)))
+                    key, parts = keys[start], []
+                parts.append(values[start:end])
+    finally:
+        conn.close()
+    if parts:
+        groups.append(_group(group_by, window_s, key, np.concatenate(parts)))
+    return groups
@@ -0,0 +1,168 @@
+# app/services/memory_stats.py
+"""
+Lightweight memory accounting for the measurement pipeline.
+
+Always on (cheap):
+  account(stage, *objs)  — adds up the byte size of the ndarrays / bytes /
+                           str a pipeline stage produced and keeps the peak,
+                           last and running average per stage.
+  request(endpoint)      — context manager that sums everything accounted
+                           inside one request and keeps a per-endpoint peak.
+
+Optional (expensive, off unless VM_TRACEMALLOC=1 or enabled at runtime):
+  tracemalloc tracing, so the diagnostics endpoint can report the traced
+  peak per stage and the top allocation sites from a snapshot.
+"""
+import os
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import numpy as np
+
+_lock = threading.Lock()
+_traced_lock = threading.Lock()   # one traced() block at a time (shared peak counter)
+_stages:    dict = {}   # stage name    → {count, last, peak, total}
+_requests:  dict = {}   # endpoint name → {count, last, peak, total}
+
+# Bytes accounted so far by the request currently executing in this context
+_current: ContextVar[list | None] = ContextVar("vm_request_bytes", default=None)
+
+if os.getenv("VM_TRACEMALLOC", "").lower() in ("1", "true"):
+    tracemalloc.start()
+
+
+def sizeof(obj) -> int:
+    """Payload size of an ndarray / bytes / str; ints are taken as a byte count."""
+    if isinstance(obj, int):
+        return obj
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        return len(obj)
+    if isinstance(obj, str):
+        return len(obj)
+    return 0
+
+
+def _bump(table: dict, key: str, nbytes: int):
+    with _lock:
+        s = table.get(key)
+        if s is None:
+            s = table[key] = {"count": 0, "last": 0, "peak": 0, "total": 0}
+        s["count"] += 1
+        s["last"]   = nbytes
+        s["total"] += nbytes
+        if nbytes > s["peak"]:
+            s["peak"] = nbytes
+
+
+def account(stage: str, *objs) -> int:
+    """Record the combined size of `objs` for `stage`; returns the byte count."""
+    nbytes = sum(sizeof(o) for o in objs)
+    _bump(_stages, stage, nbytes)
+    acc = _current.get()
+    if acc is not None:
+        acc[0] += nbytes
+    return nbytes
+
+
+@contextmanager
+def request(endpoint: str):
+    """Sum all `account()` calls made while handling one request."""
+    acc = [0]
+    token = _current.set(acc)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+        _bump(_requests, endpoint, acc[0])
+
+
+@contextmanager
+def traced(stage: str):
+    """
+    Record the tracemalloc peak of the wrapped block as stage
+    'traced:<stage>'.  No-op unless tracing is active.
+
+    The peak counter is process-wide and reset_peak() would wipe another
+    thread's in-progress peak, so while tracing is on traced blocks are
+    serialised (live frames, uploads and job workers queue up behind each
+    other — tracing is a debugging mode).  Untraced work running
+    concurrently can still raise a block's peak, never lower it.
+    """
+    if not tracemalloc.is_tracing():
+        yield
+        return
+    with _traced_lock:
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            peak = tracemalloc.get_traced_memory()[1] - base
+            _bump(_stages, f"traced:{stage}", max(peak, 0))
+
+
+def set_tracing(enabled: bool):
+    """Start or stop tracemalloc at runtime."""
+    if enabled and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    elif not enabled and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def snapshot_top(limit: int = 15) -> list[dict]:
+    """Top allocation sites by size from a fresh tracemalloc snapshot."""
+    if not tracemalloc.is_tracing():
+        return []
+    stats = tracemalloc.take_snapshot().statistics("lineno")
+    return [
+        {"site": str(s.traceback), "bytes": s.size, "blocks": s.count}
+        for s in stats[:limit]
+    ]
+
+
+def process_rss_bytes() -> int | None:
+    """Resident set size of this process (Linux only, None elsewhere)."""
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _summarise(table: dict) -> dict:
+    return {
+        k: {"count": s["count"], "last": s["last"], "peak": s["peak"],
+            "avg": s["total"] // max(s["count"], 1)}
+        for k, s in table.items()
+    }
+
+
+def report() -> dict:
+    """Snapshot of all counters (bytes)."""
+    with _lock:
+        stages   = _summarise(_stages)
+        requests = _summarise(_requests)
+    out = {
+        "rss_bytes": process_rss_bytes(),
+        "stages":    stages,
+        "requests":  requests,
+        "tracemalloc": {"tracing": tracemalloc.is_tracing()},
+    }
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        out["tracemalloc"].update({"current_bytes": current, "peak_bytes": peak})
+    return out
+
+
+def reset():
+    """Clear all counters."""
+    with _lock:
+        _stages.clear()
+        _requests.clear()
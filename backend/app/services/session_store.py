@@ -44,4 +44,28 @@ def set_scale(session_id: str, mm_per_pixel: float):
 
 def get_scale(session_id: str) -> float | None:
     s = _sessions.get(session_id)
-    return s["mm_per_pixel"] if s else None
\ No newline at end of file
+    return s["mm_per_pixel"] if s else None
+
+# ── Memory accounting ───────────────────────────────────────────────
+def _entry_bytes(entry: dict) -> int:
+    """Payload bytes held by one session (images, matrices, …)."""
+    total = 0
+    for v in entry.values():
+        if isinstance(v, np.ndarray):
+            total += v.nbytes
+        elif isinstance(v, (bytes, bytearray)):
+            total += len(v)
+        elif isinstance(v, dict):           # e.g. cached illumination field
+            total += _entry_bytes(v)
+    return total
+
+
+def session_memory(top: int = 5) -> dict:
+    """Total payload bytes across all sessions plus the `top` largest entries."""
+    sizes = [(sid, _entry_bytes(s)) for sid, s in list(_sessions.items())]
+    sizes.sort(key=lambda t: t[1], reverse=True)
+    return {
+        "count":       len(sizes),
+        "total_bytes": sum(b for _, b in sizes),
+        "largest":     [{"session_id": sid, "bytes": b} for sid, b in sizes[:top]],
+    }
@@ -0,0 +1,18 @@
+# app/utils/admin_auth.py
+
+import os
+import secrets
+
+from fastapi import Header, HTTPException
+
+
+def require_admin(x_admin_token: str | None = Header(None)):
+    """
+    FastAPI dependency for admin-only routes.  Disabled (404) unless
+    ADMIN_TOKEN is set; callers must then send it in the X-Admin-Token header.
+    """
+    expected = os.getenv("ADMIN_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, expected):
+        raise HTTPException(status_code=403, detail="Invalid admin token.")
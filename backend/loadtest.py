@@ -0,0 +1,304 @@
+"""
+VisionMetrix Load Test
+Drives the API with many concurrent simulated sessions:
+
+    calibrate (/detect-a4)  →  live frames (/auto-measure)  →  manual clicks
+                                                               (/manual-distance,
+                                                                /manual-polygon)
+
+Run in-process (no server needed, app.main:app is driven through ASGI):
+    .\\venv\\Scripts\\python.exe loadtest.py --sessions 50 --rate 5
+
+Or against a running uvicorn (pass --pid to sample the server's RSS):
+    .\\venv\\Scripts\\python.exe loadtest.py --url http://127.0.0.1:8000 --pid 1234
+
+Requires httpx (pip install httpx) in addition to requirements.txt.
+
+Reports throughput, p50/p99 latency, error and drop rate (409 = live
+frame superseded) per endpoint, RSS
+growth over time (needs psutil or Linux /proc) and (in-process only) event-loop lag — a CPU-bound
+handler that blocks the loop shows up there as lag in the hundreds of ms.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import cv2
+import numpy as np
+import httpx
+
+from app.services.a4_detector import A4_WIDTH_MM, A4_HEIGHT_MM, WARP_WIDTH, WARP_HEIGHT
+
+
+# ── Synthetic camera frames ──────────────────────────────────────────────────
+def make_frame(rng: random.Random, width: int = 1280, height: int = 960) -> bytes:
+    """
+    Render a JPEG of an A4 sheet, seen in mild perspective on a dark desk,
+    with a random rectangle and disc lying on it.
+    """
+    img = np.full((height, width, 3), rng.randint(40, 80), np.uint8)
+
+    sheet_w = int(height * 0.55)
+    sheet_h = int(sheet_w * A4_HEIGHT_MM / A4_WIDTH_MM)
+    sheet = np.full((sheet_h, sheet_w, 3), rng.randint(215, 245), np.uint8)
+
+    rx, ry = rng.randint(30, sheet_w // 3), rng.randint(30, sheet_h // 3)
+    rw, rh = rng.randint(60, sheet_w // 2), rng.randint(40, sheet_h // 4)
+    cv2.rectangle(sheet, (rx, ry), (rx + rw, ry + rh),
+                  (rng.randint(0, 120), rng.randint(0, 120), rng.randint(80, 200)), -1)
+    r = rng.randint(25, sheet_w // 6)
+    cv2.circle(sheet, (sheet_w // 2, int(sheet_h * 0.7)), r,
+               (rng.randint(80, 200), rng.randint(0, 120), rng.randint(0, 120)), -1)
+
+    # Fit the sheet into ~85 % of the frame height, then jitter the corners
+    scale = 0.85 * height / sheet_h
+    x0 = (width - sheet_w * scale) / 2
+    y0 = (height - sheet_h * scale) / 2
+    dst = np.float32([
+        [x0,                   y0],
+        [x0 + sheet_w * scale, y0],
+        [x0 + sheet_w * scale, y0 + sheet_h * scale],
+        [x0,                   y0 + sheet_h * scale],
+    ])
+    dst += np.float32([[rng.uniform(-25, 25), rng.uniform(-25, 25)] for _ in range(4)])
+    src = np.float32([[0, 0], [sheet_w, 0], [sheet_w, sheet_h], [0, sheet_h]])
+    M = cv2.getPerspectiveTransform(src, dst)
+    cv2.warpPerspective(sheet, M, (width, height), img,
+                        borderMode=cv2.BORDER_TRANSPARENT)
+
+    _, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    return buf.tobytes()
+
+
+# ── Process memory ───────────────────────────────────────────────────────────
+def rss_mb(pid: int | None = None) -> float | None:
+    """
+    Current resident set size in MB of `pid` (default: this process).
+    Uses psutil when installed, else Linux /proc.  None when neither is
+    available (Windows/macOS without psutil) — the peak RSS from `resource`
+    is not a current value and would make the growth figures meaningless.
+    """
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    except Exception:
+        return None
+    try:
+        with open(f"/proc/{pid or 'self'}/status") as fh:
+            for line in fh:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+# ── Statistics ───────────────────────────────────────────────────────────────
+class Stats:
+    """Collects per-endpoint latencies/errors plus RSS and loop-lag samples."""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = {}
+        self.errors:    dict[str, int]         = {}
+        self.dropped:   dict[str, int]         = {}
+        self.statuses:  dict[str, dict]        = {}
+        self.rss:       list[tuple[float, float]] = []
+        self.loop_lag:  list[float]            = []
+
+    def record(self, endpoint: str, seconds: float, status: int | None):
+        self.latencies.setdefault(endpoint, []).append(seconds)
+        codes = self.statuses.setdefault(endpoint, {})
+        codes[status] = codes.get(status, 0) + 1
+        if status == 409:       # live frame superseded by a newer one
+            self.dropped[endpoint] = self.dropped.get(endpoint, 0) + 1
+        elif status is None or status >= 400:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+
+def _pct(values: list[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+# ── Simulated client ─────────────────────────────────────────────────────────
+async def _call(client: httpx.AsyncClient, stats: Stats, endpoint: str,
+                data: dict, frame: bytes | None = None):
+    files = {"file": ("capture.jpg", frame, "image/jpeg")} if frame else None
+    t0 = time.perf_counter()
+    try:
+        resp = await client.post(f"/api{endpoint}", data=data, files=files)
+        status = resp.status_code
+    except httpx.HTTPError:
+        status = None
+    stats.record(endpoint, time.perf_counter() - t0, status)
+
+
+async def run_session(client: httpx.AsyncClient, stats: Stats, idx: int,
+                      frames: list[bytes], args, rng: random.Random):
+    """One user: calibrate once, stream live frames, then click a few measurements."""
+    sid = f"LOAD-{idx:05d}"
+    await _call(client, stats, "/detect-a4", {"session_id": sid}, rng.choice(frames))
+
+    for _ in range(args.frames):
+        await _call(client, stats, "/auto-measure", {"session_id": sid}, rng.choice(frames))
+        await asyncio.sleep(1.0 / args.fps)
+
+    for _ in range(args.manual):
+        p = [[rng.uniform(0, WARP_WIDTH), rng.uniform(0, WARP_HEIGHT)] for _ in range(4)]
+        await _call(client, stats, "/manual-distance",
+                    {"session_id": sid, "points": json.dumps(p[:2])})
+        await _call(client, stats, "/manual-polygon",
+                    {"session_id": sid, "points": json.dumps(p)})
+
+
+async def _monitor(stats: Stats, pid: int | None, t_start: float, interval: float):
+    """Sample RSS every `interval` s and measure how late the loop wakes us up."""
+    while True:
+        t0 = time.perf_counter()
+        await asyncio.sleep(interval)
+        stats.loop_lag.append(max(0.0, time.perf_counter() - t0 - interval))
+        stats.rss.append((time.perf_counter() - t_start, rss_mb(pid)))
+
+
+async def run(args) -> tuple[Stats, float]:
+    rng    = random.Random(args.seed)
+    frames = [make_frame(rng) for _ in range(args.images)]
+    stats  = Stats()
+
+    if args.url:
+        transport = None
+        base_url  = args.url.rstrip("/")
+    else:
+        # Keep the synthetic LOAD-* sessions out of the real history log and
+        # profile store: the in-process app writes to a throwaway directory.
+        scratch = tempfile.mkdtemp(prefix="vm-loadtest-")
+        os.environ["VM_HISTORY_DB"]  = os.path.join(scratch, "history.db")
+        os.environ["VM_PROFILE_DIR"] = os.path.join(scratch, "profiles")
+        from app.main import app
+        transport = httpx.ASGITransport(app=app)
+        base_url  = "http://loadtest"
+
+    async with httpx.AsyncClient(transport=transport, base_url=base_url,
+                                 timeout=args.timeout) as client:
+        t_start = time.perf_counter()
+        stats.rss.append((0.0, rss_mb(args.pid)))
+        monitor = asyncio.create_task(_monitor(stats, args.pid, t_start, 0.05))
+
+        # Poisson arrivals: exponential inter-arrival gaps at `rate` sessions/s
+        tasks = []
+        for i in range(args.sessions):
+            tasks.append(asyncio.create_task(
+                run_session(client, stats, i, frames, args, random.Random(rng.random()))))
+            await asyncio.sleep(rng.expovariate(args.rate))
+        await asyncio.gather(*tasks)
+
+        elapsed = time.perf_counter() - t_start
+        monitor.cancel()
+        stats.rss.append((elapsed, rss_mb(args.pid)))
+
+    if not args.url:
+        shutil.rmtree(scratch, ignore_errors=True)
+    return stats, elapsed
+
+
+# ── Report ───────────────────────────────────────────────────────────────────
+def report(stats: Stats, elapsed: float, args) -> dict:
+    endpoints = {}
+    for ep, lat in stats.latencies.items():
+        endpoints[ep] = {
+            "requests":   len(lat),
+            "throughput": round(len(lat) / elapsed, 2),
+            "p50_ms":     round(_pct(lat, 50) * 1000, 1),
+            "p99_ms":     round(_pct(lat, 99) * 1000, 1),
+            "max_ms":     round(max(lat) * 1000, 1),
+            "error_rate": round(stats.errors.get(ep, 0) / len(lat), 4),
+            "drop_rate":  round(stats.dropped.get(ep, 0) / len(lat), 4),
+            "statuses":   {str(k): v for k, v in stats.statuses[ep].items()},
+        }
+
+    total = sum(len(v) for v in stats.latencies.values())
+    samples = [(t, v) for t, v in stats.rss if v is not None]
+    if samples:
+        rss_start, rss_end = samples[0][1], samples[-1][1]
+        # Down-sample the RSS timeline to ~20 points for the report
+        step = max(1, len(samples) // 20)
+        rss = {"start": round(rss_start, 1), "end": round(rss_end, 1),
+               "peak": round(max(v for _, v in samples), 1),
+               "growth": round(rss_end - rss_start, 1),
+               "timeline": [[round(t, 2), round(v, 1)] for t, v in samples[::step]]}
+    else:
+        rss = None                          # RSS of the target process not readable
+
+    result = {
+        "mode":        "http" if args.url else "in-process",
+        "sessions":    args.sessions,
+        "elapsed_s":   round(elapsed, 2),
+        "requests":    total,
+        "throughput":  round(total / elapsed, 2),
+        "endpoints":   endpoints,
+        # Without --pid in --url mode this is the load generator's own RSS
+        "rss_source":  "server" if (args.pid or not args.url) else "client",
+        "rss_mb":      rss,
+    }
+    if not args.url:
+        result["loop_lag_ms"] = {
+            "p50": round(_pct(stats.loop_lag, 50) * 1000, 1),
+            "p99": round(_pct(stats.loop_lag, 99) * 1000, 1),
+            "max": round(max(stats.loop_lag, default=0) * 1000, 1),
+        }
+    return result
+
+
+def _print_table(result: dict):
+    print(f"\n{result['mode']}  ·  {result['sessions']} sessions  ·  "
+          f"{result['requests']} requests in {result['elapsed_s']} s  "
+          f"({result['throughput']} req/s)\n")
+    print(f"{'endpoint':<18}{'reqs':>7}{'req/s':>9}{'p50 ms':>10}"
+          f"{'p99 ms':>10}{'max ms':>10}{'errors':>9}{'dropped':>9}")
+    for ep, s in sorted(result["endpoints"].items()):
+        print(f"{ep:<18}{s['requests']:>7}{s['throughput']:>9}{s['p50_ms']:>10}"
+              f"{s['p99_ms']:>10}{s['max_ms']:>10}{s['error_rate']:>9.1%}{s['drop_rate']:>9.1%}")
+    rss = result["rss_mb"]
+    if rss is None:
+        print(f"\nRSS ({result['rss_source']})  unavailable (install psutil)")
+    else:
+        print(f"\nRSS ({result['rss_source']})  start {rss['start']} MB  →  end {rss['end']} MB  "
+              f"(peak {rss['peak']} MB, growth {rss['growth']:+} MB)")
+    if "loop_lag_ms" in result:
+        lag = result["loop_lag_ms"]
+        print(f"Event-loop lag  p50 {lag['p50']} ms  p99 {lag['p99']} ms  max {lag['max']} ms")
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__,
+                                formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--url",      help="Base URL of a running server (default: in-process ASGI)")
+    p.add_argument("--pid",      type=int, help="Server PID for RSS sampling in --url mode")
+    p.add_argument("--sessions", type=int,   default=20,  help="Number of simulated sessions")
+    p.add_argument("--rate",     type=float, default=5.0, help="Session arrivals per second")
+    p.add_argument("--frames",   type=int,   default=10,  help="Live /auto-measure frames per session")
+    p.add_argument("--fps",      type=float, default=4.0, help="Live frame rate per session")
+    p.add_argument("--manual",   type=int,   default=3,   help="Manual distance+polygon pairs per session")
+    p.add_argument("--images",   type=int,   default=8,   help="Synthetic frames to pre-render")
+    p.add_argument("--timeout",  type=float, default=60.0, help="Per-request timeout in seconds")
+    p.add_argument("--seed",     type=int,   default=0)
+    p.add_argument("--json",     action="store_true", help="Print the report as JSON")
+    args = p.parse_args(argv)
+
+    stats, elapsed = asyncio.run(run(args))
+    result = report(stats, elapsed, args)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        _print_table(result)
+
+
+if __name__ == "__main__":
+    main()
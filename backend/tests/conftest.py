@@ -0,0 +1,54 @@
+# tests/conftest.py
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+# Make `app` importable when pytest is run from backend/ or the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.a4_detector import A4_HEIGHT_MM, A4_WIDTH_MM  # noqa: E402
+
+
+def _station_frame(shift=(0, 0), size=(1280, 960)) -> np.ndarray:
+    """A4 sheet with a dark rectangle on a dark desk, optionally moved by `shift` px."""
+    width, height = size
+    img = np.full((height, width, 3), 50, np.uint8)
+    sheet_h = int(0.85 * height)
+    sheet_w = int(sheet_h * A4_WIDTH_MM / A4_HEIGHT_MM)
+    x0 = (width - sheet_w) // 2 + shift[0]
+    y0 = (height - sheet_h) // 2 + shift[1]
+    cv2.rectangle(img, (x0, y0), (x0 + sheet_w, y0 + sheet_h), (235, 235, 235), -1)
+    cv2.rectangle(img, (x0 + 80, y0 + 120), (x0 + 220, y0 + 200), (40, 40, 160), -1)
+    return cv2.GaussianBlur(img, (3, 3), 0)
+
+
+@pytest.fixture
+def station_frame():
+    """Factory for synthetic camera frames the A4 cascade can calibrate on."""
+    return _station_frame
+
+
+@pytest.fixture(scope="session")
+def history_db(tmp_path_factory):
+    # One log for the whole run: the writer thread keeps its connection open
+    return str(tmp_path_factory.mktemp("history") / "history.db")
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch, history_db):
+    """TestClient on the full app, with history and profiles outside the tree."""
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+    from app.services import calibration_profiles, measurement_log
+
+    monkeypatch.setattr(measurement_log, "DB_PATH", history_db)
+    monkeypatch.setattr(calibration_profiles, "PROFILE_DIR", str(tmp_path / "profiles"))
+    monkeypatch.setattr(calibration_profiles, "_cache", {})
+    with TestClient(app) as test_client:
+        yield test_client
+    measurement_log.flush()
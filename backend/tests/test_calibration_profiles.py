@@ -0,0 +1,43 @@
+# tests/test_calibration_profiles.py
+"""
+Measurement requests may recalibrate a drifted station for their own frame,
+but must never rewrite the shared profile (user-031).
+"""
+import numpy as np
+import pytest
+
+from app.services import calibration_profiles
+
+
+@pytest.fixture
+def station(tmp_path, monkeypatch, station_frame):
+    monkeypatch.setattr(calibration_profiles, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(calibration_profiles, "_cache", {})
+    calibration_profiles.create_profile("bench", station_frame())
+    path = tmp_path / "bench.npz"
+    return path, path.read_bytes()
+
+
+def test_stable_frame_uses_stored_matrix(station, station_frame):
+    profile = calibration_profiles._load("bench")
+    _, mm_per_pixel, M, info = calibration_profiles.warp_with_profile("bench", station_frame())
+    assert info == {"profile": "bench", "recalibrated": False, "drift_px": 0.0}
+    assert M is profile["M"]
+    assert mm_per_pixel == profile["mm_per_pixel"]
+
+
+@pytest.mark.parametrize("frame_kwargs", [
+    {"shift": (4, -3)},                                # finite drift
+    {"size": (1600, 1200)},                            # resolution mismatch → inf
+])
+def test_drift_recalibrates_without_saving(station, station_frame, frame_kwargs):
+    path, saved = station
+    profile = calibration_profiles._load("bench")
+
+    frame = station_frame(**frame_kwargs)
+    _, _, M, info = calibration_profiles.warp_with_profile("bench", frame)
+    assert info["recalibrated"] is True
+    assert not np.allclose(M, profile["M"])
+
+    assert path.read_bytes() == saved
+    assert calibration_profiles._load("bench") is profile
@@ -0,0 +1,45 @@
+# tests/test_dense_route.py
+"""
+/dense-measure runs its CPU work off the event loop and reports detection
+failures as 422 like the other measurement routes (user-034).
+"""
+import asyncio
+
+import cv2
+
+from app.routers import measure
+
+
+def _upload(client, frame):
+    _, buf = cv2.imencode(".png", frame)
+    return client.post("/api/dense-measure", data={"session_id": "dense-test"},
+                       files={"file": ("frame.png", buf.tobytes(), "image/png")})
+
+
+def test_dense_measure_runs_in_threadpool(client, station_frame, monkeypatch):
+    on_loop = []
+    detect  = measure.dense_detect_objects
+
+    def recording(*args):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:                         # worker thread: no loop
+            on_loop.append(False)
+        return detect(*args)
+    monkeypatch.setattr(measure, "dense_detect_objects", recording)
+
+    res = _upload(client, station_frame())
+    assert res.status_code == 200
+    assert res.json()["count"] >= 1
+    assert on_loop == [False]
+
+
+def test_dense_detection_failure_is_422(client, station_frame, monkeypatch):
+    def failing(*args):
+        raise ValueError("no sheet background")
+    monkeypatch.setattr(measure, "dense_detect_objects", failing)
+
+    res = _upload(client, station_frame())
+    assert res.status_code == 422
+    assert res.json()["detail"] == "Dense detection failed: no sheet background"
@@ -0,0 +1,96 @@
+# tests/test_edge_refinement.py
+"""
+`_refine_edges_normal` (user-029) must put round-shape edge points on the
+true edge: on anti-aliased discs and ellipses with known geometry, the
+refined points fit the ground truth to within a quarter pixel, where the
+expanded contour alone sits ~4 px outside it.
+"""
+import cv2
+import numpy as np
+import pytest
+
+from app.services.contour_measure import (
+    EDGE_TANGENT_K, _expand_contour, _refine_edges_normal,
+)
+
+SUPERSAMPLE = 8
+
+
+def _round_frame(seed: int, aspect: float):
+    """
+    Dark anti-aliased ellipse on a light sheet, drawn at 8× and area-averaged.
+    Returns (gray, (cx, cy, a, b)) with the exact geometry in output pixels.
+    """
+    rng = np.random.default_rng(seed)
+    h = w = 300
+    cx, cy = 150 + rng.uniform(-5, 5), 150 + rng.uniform(-5, 5)
+    a      = rng.uniform(40, 80)
+    b      = a * aspect
+    angle  = rng.uniform(0, 180)
+
+    big = np.full((h * SUPERSAMPLE, w * SUPERSAMPLE), 220, np.uint8)
+    centre = (int(cx * SUPERSAMPLE), int(cy * SUPERSAMPLE))
+    axes   = (int(a * SUPERSAMPLE), int(b * SUPERSAMPLE))
+    cv2.ellipse(big, centre, axes, angle, 0, 360, 60, -1)
+    gray = cv2.resize(big, (w, h), interpolation=cv2.INTER_AREA)
+    gray = np.clip(gray + rng.normal(0, 2, gray.shape), 0, 255).astype(np.uint8)
+
+    # Supersampled pixel k covers output [k/S, (k+1)/S); output pixel centres are at +0.5
+    truth = ((centre[0] + 0.5) / SUPERSAMPLE - 0.5, (centre[1] + 0.5) / SUPERSAMPLE - 0.5,
+             axes[0] / SUPERSAMPLE, axes[1] / SUPERSAMPLE)
+    return gray, truth
+
+
+def _expanded_contour(gray: np.ndarray) -> np.ndarray:
+    """Contour as `_measure_pca` sees it: Canny outline expanded by 4 px."""
+    edges = cv2.Canny(cv2.GaussianBlur(gray, (5, 5), 0), 50, 150)
+    edges = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, np.ones((3, 3), np.uint8))
+    cnts, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+    return _expand_contour(max(cnts, key=cv2.contourArea), pixels=4)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_disc_points_on_true_edge(seed):
+    gray, (cx, cy, r, _) = _round_frame(seed, aspect=1.0)
+    contour = _expanded_contour(gray)
+
+    pts    = _refine_edges_normal(gray, contour).reshape(-1, 2)
+    radial = np.hypot(pts[:, 0] - cx, pts[:, 1] - cy) - r
+    assert np.abs(np.median(radial)) < 0.25
+    assert np.percentile(np.abs(radial), 95) < 0.5
+
+    # Without refinement the expanded contour is several pixels outside
+    before = contour.reshape(-1, 2).astype(np.float32)
+    assert np.median(np.hypot(before[:, 0] - cx, before[:, 1] - cy) - r) > 2
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("aspect", [0.45, 0.7])
+def test_ellipse_fit_matches_ground_truth(seed, aspect):
+    gray, (cx, cy, a, b) = _round_frame(seed, aspect)
+    pts = _refine_edges_normal(gray, _expanded_contour(gray))
+
+    (ex, ey), (d1, d2), _ = cv2.fitEllipse(pts)
+    assert abs(max(d1, d2) / 2 - a) < 0.25
+    assert abs(min(d1, d2) / 2 - b) < 0.25
+    assert np.hypot(ex - cx, ey - cy) < 0.25
+
+
+def test_too_few_points_returned_unchanged():
+    gray = _round_frame(0, aspect=1.0)[0]
+    pts  = np.array([[[150, 90]], [[160, 92]], [[170, 95]], [[178, 100]],
+                     [[185, 106]], [[190, 113]]], np.int32)
+    assert len(pts) < 2 * EDGE_TANGENT_K + 1
+
+    out = _refine_edges_normal(gray, pts)
+    assert out.dtype == np.float32
+    assert out.shape == (len(pts), 1, 2)
+    np.testing.assert_array_equal(out, pts.astype(np.float32))
+
+
+def test_flat_profile_keeps_input_points():
+    gray = np.full((200, 200), 200, np.uint8)
+    pts  = cv2.ellipse2Poly((100, 100), (50, 50), 0, 0, 360, 5).reshape(-1, 1, 2)
+
+    out = _refine_edges_normal(gray, pts, decimate=1)
+    np.testing.assert_allclose(out, pts.astype(np.float32), atol=1e-4)
@@ -0,0 +1,167 @@
+# tests/test_frame_scheduler.py
+"""
+Latest-frame-wins scheduling (user-030): a newer frame drops the pending
+one, a finished frame hands the slot to the pending one, cancelled frames
+never stall the session, and the per-session drop table stays bounded.
+"""
+import asyncio
+import threading
+
+import pytest
+
+from app.services import frame_scheduler
+from app.services.frame_scheduler import FrameDropped
+
+
+@pytest.fixture(autouse=True)
+def _fresh_state():
+    frame_scheduler._slots.clear()
+    frame_scheduler._dropped.clear()
+    for key in frame_scheduler._totals:
+        frame_scheduler._totals[key] = 0
+    yield
+    frame_scheduler._slots.clear()
+    frame_scheduler._dropped.clear()
+
+
+class _Gate:
+    """A frame function that blocks in the threadpool until opened."""
+
+    def __init__(self, value):
+        self.value   = value
+        self.started = threading.Event()
+        self.opened  = threading.Event()
+
+    def __call__(self):
+        self.started.set()
+        assert self.opened.wait(5)
+        return self.value
+
+
+async def _until(cond, timeout: float = 5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not cond():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.001)
+
+
+def _slot(session_id="s"):
+    return frame_scheduler._slots.get(session_id)
+
+
+def test_newer_frame_drops_pending():
+    async def scenario():
+        first, second, third = _Gate(1), _Gate(2), _Gate(3)
+        t1 = asyncio.create_task(frame_scheduler.submit("s", first))
+        await _until(first.started.is_set)
+        t2 = asyncio.create_task(frame_scheduler.submit("s", second))
+        await _until(lambda: _slot().pending is not None)
+        t3 = asyncio.create_task(frame_scheduler.submit("s", third))
+
+        with pytest.raises(FrameDropped):
+            await t2
+        first.opened.set()
+        third.opened.set()
+        assert await t1 == 1
+        assert await t3 == 3
+        assert not second.started.is_set()
+
+    asyncio.run(scenario())
+    stats = frame_scheduler.stats()
+    assert stats["submitted"] == 3
+    assert stats["processed"] == 2
+    assert stats["dropped"] == 1
+    assert stats["top_dropped"] == [{"session_id": "s", "dropped": 1}]
+    assert stats["in_flight"] == stats["pending"] == 0
+    assert frame_scheduler._slots == {}
+
+
+def test_finished_frame_hands_slot_to_pending():
+    async def scenario():
+        first, second = _Gate(1), _Gate(2)
+        t1 = asyncio.create_task(frame_scheduler.submit("s", first))
+        await _until(first.started.is_set)
+        t2 = asyncio.create_task(frame_scheduler.submit("s", second))
+        await _until(lambda: _slot().pending is not None)
+
+        first.opened.set()
+        assert await t1 == 1
+        await _until(second.started.is_set)
+        # Handed over, not freed: the slot stays busy while the second frame runs
+        assert _slot().busy and _slot().pending is None
+        second.opened.set()
+        assert await t2 == 2
+
+    asyncio.run(scenario())
+    assert frame_scheduler._slots == {}
+    assert frame_scheduler.stats()["processed"] == 2
+
+
+def test_cancelled_pending_frame_vacates_slot():
+    async def scenario():
+        first, second = _Gate(1), _Gate(2)
+        t1 = asyncio.create_task(frame_scheduler.submit("s", first))
+        await _until(first.started.is_set)
+        t2 = asyncio.create_task(frame_scheduler.submit("s", second))
+        await _until(lambda: _slot().pending is not None)
+
+        t2.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await t2
+        assert _slot().pending is None
+        first.opened.set()
+        assert await t1 == 1
+        assert not second.started.is_set()
+
+        # The session is free again: the next frame runs straight away
+        third = _Gate(3)
+        third.opened.set()
+        assert await frame_scheduler.submit("s", third) == 3
+
+    asyncio.run(scenario())
+    assert frame_scheduler._slots == {}
+    assert frame_scheduler.stats()["dropped"] == 0
+
+
+def test_frame_cancelled_after_handoff_passes_turn_on(monkeypatch):
+    release = frame_scheduler._release
+
+    async def scenario():
+        first, second = _Gate(1), _Gate(2)
+        t1 = asyncio.create_task(frame_scheduler.submit("s", first))
+        await _until(first.started.is_set)
+        t2 = asyncio.create_task(frame_scheduler.submit("s", second))
+        await _until(lambda: _slot().pending is not None)
+
+        # Cancel the second frame right after it is handed the slot, before it resumes
+        def release_then_cancel(session_id, slot):
+            release(session_id, slot)
+            if not t2.done():
+                t2.cancel()
+        monkeypatch.setattr(frame_scheduler, "_release", release_then_cancel)
+
+        first.opened.set()
+        assert await t1 == 1
+        with pytest.raises(asyncio.CancelledError):
+            await t2
+        assert not second.started.is_set()
+        assert frame_scheduler._slots == {}
+
+        third = _Gate(3)
+        third.opened.set()
+        assert await frame_scheduler.submit("s", third) == 3
+
+    asyncio.run(scenario())
+
+
+def test_drop_table_keeps_worst_sessions(monkeypatch):
+    monkeypatch.setattr(frame_scheduler, "DROPPED_TRACKED", 4)
+    for _ in range(5):
+        frame_scheduler._count("dropped", "noisy")
+    for i in range(20):
+        frame_scheduler._count("dropped", f"s{i}")
+
+    assert len(frame_scheduler._dropped) == 4
+    stats = frame_scheduler.stats(top=1)
+    assert stats["dropped"] == 25
+    assert stats["top_dropped"] == [{"session_id": "noisy", "dropped": 5}]
@@ -0,0 +1,47 @@
+# tests/test_history_routes.py
+"""
+History export / aggregate (user-035): one session's rows are readable with
+its session ID; every session's rows need the admin token.
+"""
+import pytest
+
+from app.services import measurement_log
+
+ADMIN = {"X-Admin-Token": "s3cret"}
+
+
+@pytest.fixture
+def history(client, monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", ADMIN["X-Admin-Token"])
+    measurement_log.record("alice", "manual-distance", [{"distance_mm": 10.0}])
+    measurement_log.record("bob", "manual-distance", [{"distance_mm": 30.0}])
+    measurement_log.flush()
+    return client
+
+
+@pytest.mark.parametrize("path", ["/api/history/export", "/api/history/aggregate"])
+def test_all_sessions_need_admin_token(history, path):
+    assert history.get(path).status_code == 403
+    assert history.get(path, headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert history.get(path, headers=ADMIN).status_code == 200
+
+
+@pytest.mark.parametrize("path", ["/api/history/export", "/api/history/aggregate"])
+def test_all_sessions_hidden_without_admin_token_configured(history, monkeypatch, path):
+    monkeypatch.delenv("ADMIN_TOKEN")
+    assert history.get(path).status_code == 404
+
+
+def test_single_session_export_is_open(history):
+    res = history.get("/api/history/export",
+                      params={"format": "json", "session_id": "alice"})
+    assert res.status_code == 200
+    assert {r["session_id"] for r in res.json()} == {"alice"}
+
+
+def test_single_session_aggregate_is_open(history):
+    res = history.get("/api/history/aggregate", params={"session_id": "bob"})
+    assert res.status_code == 200
+    (group,) = res.json()["groups"]
+    assert group["session_id"] == "bob"
+    assert group["distance_mm"]["mean"] == 30.0
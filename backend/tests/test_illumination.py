@@ -0,0 +1,110 @@
+# tests/test_illumination.py
+"""
+The reduced-resolution illumination field (user-033) must stay within a
+fixed tolerance of the original full-resolution 61×61 blur + fresh CLAHE,
+and the per-session cache must only be reused while the field itself would
+not change — a lighting change or a moved part invalidates it, sensor noise
+does not.
+"""
+import cv2
+import numpy as np
+import pytest
+
+from app.services.contour_measure import (
+    ILLUM_STABLE_TOL, _illumination_field, _normalise_illumination,
+)
+
+
+def _shaded_frame(seed: int) -> np.ndarray:
+    """Warped-size A4 frame: lighting gradient, soft shadow, dark objects, noise."""
+    rng  = np.random.default_rng(seed)
+    h, w = 1131, 800
+    yy, xx = np.mgrid[0:h, 0:w].astype(np.float32)
+    img = np.full((h, w), 225, np.float32)
+    for _ in range(6):
+        cx, cy = int(rng.integers(100, w - 100)), int(rng.integers(100, h - 100))
+        value  = float(rng.integers(30, 140))
+        if rng.random() < 0.5:
+            cv2.circle(img, (cx, cy), int(rng.integers(30, 90)), value, -1)
+        else:
+            cv2.rectangle(img, (cx - 60, cy - 40), (cx + 60, cy + 40), value, -1)
+    light  = 0.55 + 0.45 * (xx / w) * (0.6 + 0.4 * yy / h)
+    shadow = cv2.GaussianBlur(((xx - 300) ** 2 + (yy - 500) ** 2 < 150 ** 2).astype(np.float32),
+                              (0, 0), 40)
+    img = img * light * (1 - 0.35 * shadow) + rng.normal(0, 2, (h, w))
+    return np.clip(img, 0, 255).astype(np.uint8)
+
+
+def _reference_field(gray):
+    return cv2.GaussianBlur(gray, (61, 61), 0)
+
+
+def _reference_normalise(gray):
+    normalised = cv2.divide(gray, _reference_field(gray), scale=255)
+    return cv2.createCLAHE(clipLimit=2.5, tileGridSize=(8, 8)).apply(normalised)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_field_matches_full_resolution_blur(seed):
+    gray = _shaded_frame(seed)
+    diff = np.abs(_illumination_field(gray).astype(int) - _reference_field(gray).astype(int))
+    assert diff.mean() < 0.25
+    assert diff.max() <= 3
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_normalised_output_matches_reference(seed):
+    gray = _shaded_frame(seed)
+    diff = np.abs(_normalise_illumination(gray).astype(int)
+                  - _reference_normalise(gray).astype(int))
+    assert diff.mean() < 0.4
+    assert np.percentile(diff, 99) <= 8
+    # Larger differences only at strong edges, where CLAHE amplifies the
+    # slightly softer field; bounded so a regression still shows up
+    assert diff.max() <= 40
+
+
+def test_cached_field_reused_when_scene_unchanged():
+    gray  = _shaded_frame(0)
+    cache = {}
+    field = _illumination_field(gray, cache)
+
+    # Uniform shift just under the tolerance → the cached field comes back as-is
+    shift = int(ILLUM_STABLE_TOL) - 1
+    nudged = cv2.add(gray, np.full_like(gray, shift))
+    assert _illumination_field(nudged, cache) is field
+
+    # Same scene, fresh sensor noise → reused, and still close to a fresh field
+    noise   = np.random.default_rng(1).normal(0, 2, gray.shape)
+    recaptured = np.clip(gray + noise, 0, 255).astype(np.uint8)
+    assert _illumination_field(recaptured, cache) is field
+    diff = np.abs(field.astype(int) - _illumination_field(recaptured).astype(int))
+    assert diff.max() <= ILLUM_STABLE_TOL + 1
+
+
+@pytest.mark.parametrize("radius", [10, 40])
+def test_cached_field_discarded_when_part_moves(radius):
+    gray  = _shaded_frame(0)
+    cache = {}
+    field = _illumination_field(gray, cache)
+
+    # Same lighting, one more part on the sheet: the mean over the frame
+    # barely moves, but the field around the part does
+    moved = gray.copy()
+    cv2.circle(moved, (400, 300), radius, 60, -1)
+    assert np.abs(moved.astype(int) - gray.astype(int)).mean() < ILLUM_STABLE_TOL
+    fresh = _illumination_field(moved, cache)
+    assert fresh is not field
+    np.testing.assert_array_equal(fresh, _illumination_field(moved))
+
+
+def test_cached_field_discarded_when_lighting_changes():
+    gray  = _shaded_frame(0)
+    cache = {}
+    field = _illumination_field(gray, cache)
+
+    darker = cv2.subtract(gray, np.full_like(gray, int(ILLUM_STABLE_TOL) + 3))
+    fresh = _illumination_field(darker, cache)
+    assert fresh is not field
+    assert cache["field"] is fresh
+    np.testing.assert_array_equal(fresh, _illumination_field(darker))
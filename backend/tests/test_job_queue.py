@@ -0,0 +1,91 @@
+# tests/test_job_queue.py
+"""
+Unfinished jobs hold their upload bytes (user-036): the queue caps them
+in total, refuses a single payload that could never fit, reports them in
+memory(), and releases them once the job finishes.
+"""
+import threading
+import time
+
+import pytest
+
+from app.services import job_queue
+from app.services.job_queue import JobTooLarge, QueueFull
+
+MB = 2**20
+
+
+@pytest.fixture(autouse=True)
+def _fresh_queue(monkeypatch):
+    monkeypatch.setattr(job_queue, "_jobs", {})
+    monkeypatch.setattr(job_queue, "MAX_QUEUED_BYTES", 3 * MB)
+    release = threading.Event()
+    yield release
+    release.set()                                # let any blocked workers finish
+
+
+def _blocking(release):
+    def fn(payload: bytes, on_stage=None):
+        assert release.wait(5)
+        return {"size": len(payload)}
+    return fn
+
+
+def _wait_done(job, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while job.status not in job_queue.TERMINAL:
+        assert time.monotonic() < deadline, "job did not finish"
+        time.sleep(0.005)
+
+
+def test_queued_bytes_capped_and_reported(_fresh_queue):
+    fn = _blocking(_fresh_queue)
+    jobs = [job_queue.submit("test", fn, bytes(MB)) for _ in range(3)]
+
+    mem = job_queue.memory()
+    assert mem["active"] == 3
+    assert mem["queued_bytes"] == 3 * MB
+    assert mem["max_queued_bytes"] == 3 * MB
+
+    rejected = job_queue.stats()["rejected"]
+    with pytest.raises(QueueFull):
+        job_queue.submit("test", fn, b"x")
+    assert job_queue.stats()["rejected"] == rejected + 1
+
+    _fresh_queue.set()
+    for job in jobs:
+        _wait_done(job)
+    mem = job_queue.memory()
+    assert mem["active"] == 0
+    assert mem["queued_bytes"] == 0
+    assert mem["retained"] == 3
+
+
+def test_single_payload_over_cap_is_too_large(_fresh_queue):
+    with pytest.raises(JobTooLarge):
+        job_queue.submit("test", _blocking(_fresh_queue), bytes(3 * MB + 1))
+    assert job_queue.memory()["active"] == 0
+
+
+def test_max_active_caps_job_count(_fresh_queue, monkeypatch):
+    monkeypatch.setattr(job_queue, "MAX_ACTIVE", 2)
+    fn = _blocking(_fresh_queue)
+    job_queue.submit("test", fn, b"a")
+    job_queue.submit("test", fn, b"b")
+    with pytest.raises(QueueFull):
+        job_queue.submit("test", fn, b"c")
+
+
+def test_upload_route_maps_limits(client, _fresh_queue, monkeypatch):
+    monkeypatch.setattr(job_queue, "MAX_QUEUED_BYTES", 1000)
+    files = {"file": ("frame.png", bytes(1001), "image/png")}
+    res = client.post("/api/jobs/upload-measure", data={"session_id": "jobs-test"},
+                      files=files)
+    assert res.status_code == 413
+
+    monkeypatch.setattr(job_queue, "MAX_ACTIVE", 0)
+    files = {"file": ("frame.png", bytes(10), "image/png")}
+    res = client.post("/api/jobs/upload-measure", data={"session_id": "jobs-test"},
+                      files=files)
+    assert res.status_code == 503
+    assert res.headers["Retry-After"] == "5"
@@ -0,0 +1,75 @@
+# tests/test_measurement_log.py
+"""
+aggregate() summarises one group at a time as the sorted cursor passes it
+(user-035); groups that span fetch chunks must come out exactly as if the
+whole table had been loaded.
+"""
+import sqlite3
+
+import numpy as np
+import pytest
+
+from app.services import measurement_log
+from app.services.measurement_log import METRICS, PERCENTILES
+
+
+@pytest.fixture
+def log_db(tmp_path, monkeypatch):
+    path = str(tmp_path / "history.db")
+    rng  = np.random.default_rng(0)
+    rows = []
+    for i in range(3000):
+        width = float(rng.uniform(5, 80))
+        rows.append((1000.0 + i * 7.0, f"s{rng.integers(0, 7)}", "upload-measure", 0,
+                     "polygon", width, width / 2, width * width / 2,
+                     None if i % 3 else float(i)))
+    conn = sqlite3.connect(path)
+    conn.executescript(measurement_log._SCHEMA)
+    conn.executemany(measurement_log._INSERT, rows)
+    conn.commit()
+    conn.close()
+
+    monkeypatch.setattr(measurement_log, "DB_PATH", path)
+    monkeypatch.setattr(measurement_log, "EXPORT_CHUNK", 17)    # groups span chunks
+    return rows
+
+
+def _expected(rows, key_of):
+    groups = {}
+    for r in rows:
+        groups.setdefault(key_of(r), []).append(r[5:])
+    out = {}
+    for key, values in groups.items():
+        arr = np.array(values, dtype=np.float64)
+        out[key] = {"rows": len(values)}
+        for j, metric in enumerate(METRICS):
+            col = arr[:, j][~np.isnan(arr[:, j])]
+            if col.size:
+                out[key][metric] = {
+                    "count": int(col.size), "mean": round(float(col.mean()), 2),
+                    **{f"p{p}": round(float(v), 2)
+                       for p, v in zip(PERCENTILES, np.percentile(col, PERCENTILES))},
+                }
+    return out
+
+
+def test_aggregate_by_session(log_db):
+    groups = measurement_log.aggregate("session")
+    assert [g["session_id"] for g in groups] == sorted(g["session_id"] for g in groups)
+    got = {g.pop("session_id"): g for g in groups}
+    assert got == _expected(log_db, lambda r: r[1])
+
+
+def test_aggregate_by_window(log_db):
+    groups = measurement_log.aggregate("window", window_s=600)
+    got = {}
+    for g in groups:
+        start, end = g.pop("window_start"), g.pop("window_end")
+        assert end - start == 600
+        got[int(start // 600)] = g
+    assert got == _expected(log_db, lambda r: int(r[0] / 600))
+
+
+def test_aggregate_filters_one_session(log_db):
+    (group,) = measurement_log.aggregate("window", window_s=1e9, session_id="s3")
+    assert group["rows"] == sum(1 for r in log_db if r[1] == "s3")